@@ -3,18 +3,42 @@ FastAPI application exposing /api/titles and /api/recommend endpoints.
 """
 from __future__ import annotations
 
-from typing import List
+import json
+from typing import Any, Dict, List
 
-from fastapi import FastAPI, HTTPException, Query
+import numpy as np
+import pandas as pd
+from fastapi import Depends, FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
 
+from . import settings
+from .arrow_io import (
+    JSON,
+    metadata_table,
+    negotiate_format,
+    recommendations_table,
+    table_response,
+    titles_table,
+)
+from .cursor_store import CursorQuery, CursorStore, decode_cursor
 from .recommender_core import (
     FilterParams,
     MovieRecommender,
+    default_search_k,
+    filter_key,
     normalize_genre_list,
     parse_list_arg,
 )
+from .response_cache import (
+    ENCODERS,
+    CompressedResponseCache,
+    compressed_response,
+    encoded_response,
+    negotiate_encoding,
+)
 from .schemas import FilterPayload, RecommendRequest, TitleResponse
+from .sharded_recommender import ShardedRecommender, ShardUnavailableError
+from .title_search import TitleSearchIndex
 
 
 app = FastAPI(title="Movie Recommender API", version="1.0.0")
@@ -23,9 +47,30 @@ app.add_middleware(
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Total-Count"],
 )
 
-recommender = MovieRecommender()
+recommender = ShardedRecommender() if settings.SHARDED else MovieRecommender()
+response_cache = CompressedResponseCache()
+cursor_store = CursorStore()
+arrow_titles = metadata_table(recommender.metadata)
+title_index = TitleSearchIndex(recommender.metadata["title"].tolist())
+
+
+def title_filters(
+    platforms: str | None = Query(default=None, description="Comma separated platforms"),
+    types: str | None = Query(default=None, description="Comma separated types"),
+    countries: str | None = Query(default=None, description="Comma separated countries"),
+    minYear: int | None = Query(default=None),
+    maxYear: int | None = Query(default=None),
+) -> FilterParams:
+    return FilterParams(
+        platform=parse_list_arg(platforms),
+        type=parse_list_arg(types),
+        country=parse_list_arg(countries),
+        min_year=minYear,
+        max_year=maxYear,
+    )
 
 
 def to_filter_params(payload: FilterPayload | None) -> FilterParams | None:
@@ -40,55 +85,154 @@ def to_filter_params(payload: FilterPayload | None) -> FilterParams | None:
     )
 
 
-def serialize_titles(df) -> List[TitleResponse]: #return json to dataframe
-    return [
-        TitleResponse(
-            vector_id=int(row.vector_id),
-            title=row.title,
-            platform=row.platform,
-            type=row.type,
-            release_year=int(row.release_year),
-            genre_list=normalize_genre_list(row.genre_list),
-            country=row.country,
-            description=row.description,
-        )
-        for _, row in df.iterrows()
+def serialize_titles(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """
+    Column-wise equivalent of building a TitleResponse per row (no per-row pandas access).
+    """
+    def optional(column: str) -> List[Any]:
+        if column not in df:
+            return [None] * len(df)
+        return [None if pd.isna(value) else value for value in df[column].tolist()]
+
+    columns = {
+        "vector_id": df["vector_id"].astype(int).tolist(),
+        "title": df["title"].tolist(),
+        "platform": df["platform"].tolist(),
+        "type": df["type"].tolist(),
+        "release_year": df["release_year"].astype(int).tolist(),
+        "genre_list": [normalize_genre_list(value) for value in df["genre_list"].tolist()],
+        "country": optional("country"),
+        "description": optional("description"),
+    }
+    fields = list(columns)
+    return [dict(zip(fields, values)) for values in zip(*columns.values())]
+
+
+def titles_json(df: pd.DataFrame) -> bytes:
+    return json.dumps(serialize_titles(df), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def warm_response_cache() -> None:
+    """
+    Precompress the hottest /api/titles responses (unfiltered and per platform).
+    """
+    combos = [FilterParams()] + [
+        FilterParams(platform=[platform]) for platform in recommender.metadata["platform"].dropna().unique()
     ]
+    for filters in combos:
+        for encoding in ENCODERS:
+            response_cache.get(
+                recommender.version,
+                ("titles", filter_key(filters)),
+                encoding,
+                lambda: titles_json(recommender.list_titles(filters)),
+            )
+
+
+# Serialized once so autocomplete responses are just a lookup per hit.
+title_records = serialize_titles(recommender.metadata)
+
+if settings.RESPONSE_CACHE_WARMUP:
+    warm_response_cache()
+    # Built before backend.serve forks, so the warm set is shared by every worker.
+    response_cache.pin()
 
 
 @app.get("/api/titles", response_model=List[TitleResponse])
-def list_titles(
-    platforms: str | None = Query(default=None, description="Comma separated platforms"),
-    types: str | None = Query(default=None, description="Comma separated types"),
-    countries: str | None = Query(default=None, description="Comma separated countries"),
-    minYear: int | None = Query(default=None),
-    maxYear: int | None = Query(default=None),
+def list_titles(request: Request, filters: FilterParams = Depends(title_filters)):
+    media_type = negotiate_format(request.headers.get("accept"))
+    if media_type != JSON:
+        try:
+            mask = recommender.require_mask(filters)
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc))
+        return table_response(titles_table(arrow_titles, mask), media_type)
+
+    encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+    try:
+        body = response_cache.get(
+            recommender.version,
+            ("titles", filter_key(filters)),
+            encoding,
+            lambda: titles_json(recommender.list_titles(filters)),
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    return encoded_response(body, encoding)
+
+
+@app.get("/api/titles/page", response_model=List[TitleResponse])
+def page_titles(
+    request: Request,
+    offset: int = Query(default=0, ge=0),
+    limit: int = Query(default=24, ge=1, le=200),
+    filters: FilterParams = Depends(title_filters),
 ):
-    filters = FilterParams(
-        platform=parse_list_arg(platforms),
-        type=parse_list_arg(types),
-        country=parse_list_arg(countries),
-        min_year=minYear,
-        max_year=maxYear,
+    """
+    One page of the filtered catalog in vector_id order; X-Total-Count carries the
+    number of matching titles so clients can page without downloading the list.
+    """
+    rows = np.flatnonzero(recommender.filter_mask(filters))
+    body = json.dumps(
+        [title_records[row] for row in rows[offset : offset + limit].tolist()],
+        ensure_ascii=False,
+        separators=(",", ":"),
     )
+    response = compressed_response(body.encode("utf-8"), request.headers.get("accept-encoding"))
+    response.headers["X-Total-Count"] = str(rows.size)
+    return response
+
+
+@app.get("/api/titles/search", response_model=List[TitleResponse])
+def search_titles(
+    request: Request,
+    q: str = Query(min_length=1, description="Title prefix or words to match"),
+    limit: int = Query(default=10, ge=1, le=50),
+    filters: FilterParams = Depends(title_filters),
+):
+    rows = title_index.search(q, mask=recommender.filter_mask(filters), limit=limit)
+    body = json.dumps([title_records[row] for row in rows.tolist()], ensure_ascii=False, separators=(",", ":"))
+    return compressed_response(body.encode("utf-8"), request.headers.get("accept-encoding"))
+
+
+def recommendation_page(query: CursorQuery, offset: int, limit: int, request: Request):
+    """
+    One page of ranked recommendations; `X-Next-Cursor` carries the cursor for the
+    next page and is omitted once the candidates run out.
+    """
+    search_k = default_search_k(limit)
     try:
-        df = recommender.list_titles(filters)
+        ids, scores, next_cursor = cursor_store.page(recommender, query, offset, limit, search_k)
     except ValueError as exc:
         raise HTTPException(status_code=400, detail=str(exc))
-    return serialize_titles(df)
+    except ShardUnavailableError as exc:
+        raise HTTPException(status_code=503, detail=str(exc))
+
+    media_type = negotiate_format(request.headers.get("accept"))
+    if media_type != JSON:
+        response = table_response(recommendations_table(arrow_titles, ids, scores), media_type)
+    else:
+        body = json.dumps([title_records[row] for row in ids.tolist()], ensure_ascii=False, separators=(",", ":"))
+        response = compressed_response(body.encode("utf-8"), request.headers.get("accept-encoding"))
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return response
 
 
 @app.post("/api/recommend", response_model=List[TitleResponse])
-def recommend(payload: RecommendRequest):
-    filters = to_filter_params(payload.filters)
-    search_k = max(200, payload.top_k * 50)
+def recommend(payload: RecommendRequest, request: Request):
+    query = CursorQuery(tuple(payload.seed_ids), to_filter_params(payload.filters), payload.mode)
+    return recommendation_page(query, 0, payload.top_k, request)
+
+
+@app.get("/api/recommend/next", response_model=List[TitleResponse])
+def recommend_next(
+    request: Request,
+    cursor: str = Query(min_length=1, description="X-Next-Cursor value from the previous page"),
+    top_k: int = Query(default=5, ge=1, le=50),
+):
     try:
-        df = recommender.recommend(
-            seed_ids=payload.seed_ids,
-            filters=filters,
-            top_k=payload.top_k,
-            search_k=search_k,
-        )
+        query, offset = decode_cursor(cursor)
     except ValueError as exc:
         raise HTTPException(status_code=400, detail=str(exc))
-    return serialize_titles(df)
+    return recommendation_page(query, offset, top_k, request)
@@ -0,0 +1,116 @@
+"""
+Arrow IPC stream and Parquet response formats for bulk API consumers.
+
+Tables are sliced straight from an Arrow copy of the title metadata (filter/take on
+columnar buffers), so no per-row Python objects or JSON are produced.
+"""
+from __future__ import annotations
+
+import io
+from typing import Dict, Iterator, Sequence
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from fastapi import Response
+from fastapi.responses import StreamingResponse
+
+JSON = "application/json"
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+PARQUET = "application/vnd.apache.parquet"
+
+MEDIA_TYPES: Dict[str, str] = {
+    JSON: JSON,
+    ARROW_STREAM: ARROW_STREAM,
+    PARQUET: PARQUET,
+    "application/x-parquet": PARQUET,
+}
+
+TITLE_COLUMNS = [
+    "vector_id",
+    "title",
+    "platform",
+    "type",
+    "release_year",
+    "genre_list",
+    "country",
+    "description",
+]
+BATCH_ROWS = 4096
+
+
+def negotiate_format(accept: str | None) -> str:
+    """
+    Choose JSON, Arrow IPC stream or Parquet from an Accept header (JSON by default).
+    """
+    if not accept:
+        return JSON
+
+    best, best_q = JSON, 0.0
+    for part in accept.split(","):
+        media, _, params = part.strip().partition(";")
+        media = media.strip().lower()
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        chosen = MEDIA_TYPES.get(media)
+        if chosen is not None and q > best_q:
+            best, best_q = chosen, q
+    return best
+
+
+def metadata_table(metadata: pd.DataFrame) -> pa.Table:
+    """
+    Arrow copy of the title columns; build once at startup and slice per request.
+    """
+    frame = metadata[[c for c in TITLE_COLUMNS if c in metadata]]
+    return pa.Table.from_pandas(frame, preserve_index=False).combine_chunks()
+
+
+def titles_table(table: pa.Table, mask: np.ndarray) -> pa.Table:
+    return table.filter(pa.array(mask))
+
+
+def recommendations_table(table: pa.Table, ids: Sequence[int], scores: Sequence[float]) -> pa.Table:
+    ranked = table.take(pa.array(np.asarray(ids, dtype=np.int64)))
+    return ranked.append_column("score", pa.array(np.asarray(scores, dtype=np.float32)))
+
+
+def iter_arrow_stream(table: pa.Table) -> Iterator[bytes]:
+    """
+    Yield the IPC stream one record batch at a time so large tables are never
+    serialized into a single buffer.
+    """
+    buffer = io.BytesIO()
+
+    def drain() -> bytes:
+        data = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return data
+
+    with pa.ipc.new_stream(buffer, table.schema) as writer:
+        yield drain()
+        for batch in table.to_batches(max_chunksize=BATCH_ROWS):
+            writer.write_batch(batch)
+            yield drain()
+    yield drain()
+
+
+def table_response(table: pa.Table, media_type: str) -> Response:
+    if media_type == ARROW_STREAM:
+        return StreamingResponse(
+            iter_arrow_stream(table), media_type=ARROW_STREAM, headers={"Vary": "Accept, Accept-Encoding"}
+        )
+
+    buffer = io.BytesIO()
+    pq.write_table(table, buffer, compression="zstd")
+    return Response(
+        content=buffer.getvalue(), media_type=PARQUET, headers={"Vary": "Accept, Accept-Encoding"}
+    )
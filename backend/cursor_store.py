@@ -0,0 +1,224 @@
+"""
+Paging cursors for /api/recommend backed by a store of ranked candidate lists.
+
+The first request searches once and keeps every filtered candidate it found; later
+pages are slices of that list, and a deeper search runs only when a page reaches
+past its end. Entries are bounded in number and total size, expire after a TTL, and
+never reach deeper than MOVIE_REC_CURSOR_MAX_DEPTH results. Lists built
+from a search some shards did not answer are served but never stored, so the next
+page searches again rather than reusing them for the whole TTL.
+
+A cursor encodes its query and offset rather than a store handle, so a page landing
+on another worker (or after eviction) re-runs the search instead of failing. The
+store is per process, so each pre-forked worker that serves a page of a query runs
+its own search for it. Cursors are client-controlled; `decode_cursor` type-checks
+the payload and rejects anything `encode_cursor` would not produce.
+"""
+from __future__ import annotations
+
+import base64
+import binascii
+import json
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, fields
+from typing import Any, Dict, Hashable, Tuple
+
+import numpy as np
+
+from . import settings
+from .recommender_core import SEARCH_MODES, FilterParams, MovieRecommender, filter_key
+
+GROWTH_FACTOR = 4
+
+
+@dataclass(frozen=True)
+class CursorQuery:
+    seed_ids: Tuple[int, ...]
+    filters: FilterParams | None
+    mode: str = "dense"
+
+    def key(self, version: str) -> Hashable:
+        return (version, self.seed_ids, filter_key(self.filters), self.mode)
+
+
+def encode_cursor(query: CursorQuery, offset: int) -> str:
+    payload = {
+        "s": list(query.seed_ids),
+        "f": asdict(query.filters) if query.filters is not None else None,
+        "m": query.mode,
+        "o": offset,
+    }
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _is_int(value: Any) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _decode_filters(raw: Any) -> FilterParams | None:
+    """
+    FilterParams from a cursor payload, rejecting anything `encode_cursor` would not
+    have written (the cursor is client-controlled).
+    """
+    if raw is None:
+        return None
+    if not isinstance(raw, dict) or not raw.keys() <= {f.name for f in fields(FilterParams)}:
+        raise ValueError("Invalid cursor.")
+    for name in ("platform", "type", "country"):
+        values = raw.get(name)
+        if values is not None and not (isinstance(values, list) and all(isinstance(v, str) for v in values)):
+            raise ValueError("Invalid cursor.")
+    for name in ("min_year", "max_year"):
+        if raw.get(name) is not None and not _is_int(raw[name]):
+            raise ValueError("Invalid cursor.")
+    return FilterParams(**raw)
+
+
+def decode_cursor(cursor: str) -> Tuple[CursorQuery, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        seed_ids, mode, offset = payload["s"], payload["m"], payload["o"]
+        filters = _decode_filters(payload["f"])
+    except (binascii.Error, ValueError, KeyError, TypeError) as exc:
+        raise ValueError("Invalid cursor.") from exc
+    if not (isinstance(seed_ids, list) and all(_is_int(v) for v in seed_ids)):
+        raise ValueError("Invalid cursor.")
+    if mode not in SEARCH_MODES or not _is_int(offset) or not 0 <= offset < settings.CURSOR_MAX_DEPTH:
+        raise ValueError("Invalid cursor.")
+    return CursorQuery(tuple(seed_ids), filters, mode), offset
+
+
+@dataclass
+class RankedList:
+    ids: np.ndarray
+    scores: np.ndarray
+    search_k: int
+    exhausted: bool
+    complete: bool  # False when shards were missing from a search; never stored
+    expires_at: float
+
+
+class CursorStore:
+    """
+    LRU + TTL store of ranked, filtered candidate lists keyed by query, bounded by
+    entry count and by the bytes of the stored arrays.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = settings.CURSOR_CACHE_ENTRIES,
+        ttl_seconds: float = settings.CURSOR_TTL_SECONDS,
+        max_bytes: int = settings.CURSOR_CACHE_MAX_BYTES,
+        max_depth: int = settings.CURSOR_MAX_DEPTH,
+    ) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.max_depth = max_depth
+        self._entries: "OrderedDict[Hashable, RankedList]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def page(
+        self,
+        recommender: MovieRecommender,
+        query: CursorQuery,
+        offset: int,
+        limit: int,
+        search_k: int,
+    ) -> Tuple[np.ndarray, np.ndarray, str | None]:
+        """
+        Candidates [offset, offset + limit) of `query` and the cursor for the next
+        page (None once the candidates or `max_depth` are exhausted). The first page
+        raises ValueError when nothing matches, like `MovieRecommender.recommend`.
+        """
+        key = query.key(recommender.version)
+        entry = self._lookup(key)
+        if entry is None:
+            ids, scores, exhausted, complete = recommender.ranked_candidates(
+                query.seed_ids, query.filters, search_k, query.mode
+            )
+            entry = RankedList(ids, scores, search_k, exhausted, complete, 0.0)
+
+        end = min(offset + limit, self.max_depth)
+        while entry.ids.size < end and not entry.exhausted:
+            entry = self._extend(recommender, query, entry, end)
+        if entry.ids.size > self.max_depth:
+            # Nothing past max_depth is ever served, so do not keep it either.
+            entry = RankedList(
+                entry.ids[: self.max_depth],
+                entry.scores[: self.max_depth],
+                entry.search_k,
+                True,
+                entry.complete,
+                0.0,
+            )
+        if entry.complete:
+            self._store(key, entry)
+
+        if offset == 0 and entry.ids.size == 0:
+            raise ValueError("No recommendations found. Try relaxing filters.")
+        has_more = entry.ids.size > end or not entry.exhausted
+        next_cursor = encode_cursor(query, end) if has_more else None
+        return entry.ids[offset:end], entry.scores[offset:end], next_cursor
+
+    def _extend(
+        self, recommender: MovieRecommender, query: CursorQuery, entry: RankedList, needed: int
+    ) -> RankedList:
+        """
+        Re-search deeper and append the candidates not already listed; the served
+        prefix is kept as-is so pages never repeat or skip titles.
+        """
+        search_k = max(entry.search_k * GROWTH_FACTOR, needed * 2)
+        ids, scores, exhausted, complete = recommender.ranked_candidates(
+            query.seed_ids, query.filters, search_k, query.mode
+        )
+        fresh = ~np.isin(ids, entry.ids)
+        return RankedList(
+            np.concatenate([entry.ids, ids[fresh]]),
+            np.concatenate([entry.scores, scores[fresh]]),
+            search_k,
+            exhausted,
+            entry.complete and complete,
+            0.0,
+        )
+
+    def _lookup(self, key: Hashable) -> RankedList | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.expires_at < time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def _store(self, key: Hashable, entry: RankedList) -> None:
+        entry.expires_at = time.monotonic() + self.ttl_seconds
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self._size += _nbytes(entry)
+            while self._entries and (len(self._entries) > self.max_entries or self._size > self.max_bytes):
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, key: Hashable) -> None:
+        self._size -= _nbytes(self._entries.pop(key))
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "candidates": sum(entry.ids.size for entry in self._entries.values()),
+                "bytes": self._size,
+            }
+
+
+def _nbytes(entry: RankedList) -> int:
+    return entry.ids.nbytes + entry.scores.nbytes
@@ -1,21 +1,49 @@
 from __future__ import annotations
 
 import argparse
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 from pathlib import Path
+from typing import IO, Any, Dict, Iterable, Iterator, List, Tuple
 
 import pandas as pd
 
-from .recommender_core import FilterParams, MovieRecommender, parse_list_arg
+from .recommender_core import (
+    FilterParams,
+    MovieRecommender,
+    default_search_k,
+    normalize_genre_list,
+    parse_list_arg,
+)
+from .sharded_recommender import ShardedRecommender, ShardUnavailableError
 from . import settings
 
+RESULT_COLUMNS = ["vector_id", "score", "title", "platform", "type", "release_year", "genre_list"]
+
 
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="Return movie recommendations using a FAISS index.")
     parser.add_argument("--embeddings", type=Path, default=settings.EMBEDDINGS_PATH)
     parser.add_argument("--metadata", type=Path, default=settings.METADATA_PATH)
     parser.add_argument("--index", type=Path, default=settings.INDEX_PATH)
+    parser.add_argument("--lexical", type=Path, default=settings.LEXICAL_PATH, help="BM25 matrix for --mode hybrid.")
+    parser.add_argument(
+        "--sharded",
+        action="store_true",
+        default=settings.SHARDED,
+        help="Search through running shard servers (python -m backend.shard_server) instead of a local index.",
+    )
 
-    parser.add_argument("--seed-ids", type=int, nargs="+", required=True, help="Seed vector_ids (1-3 recommended).")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--seed-ids", type=int, nargs="+", help="Seed vector_ids (1-3 recommended).")
+    source.add_argument(
+        "--batch",
+        help="JSONL file of jobs ('-' for stdin). Each line: "
+        '{"id": ..., "seed_ids": [...], "filters": {"platforms": [...], ...}, "top_k": 5}.',
+    )
 
     parser.add_argument("--platforms", help="Comma-separated platforms (e.g., 'Netflix,Disney+').")
     parser.add_argument("--types", help="Comma-separated types (e.g., 'Movie,TV Show').")
@@ -24,18 +52,292 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument("--max-year", type=int, help="Maximum release year.")
 
     parser.add_argument("--top-k", type=int, default=5)
-    parser.add_argument("--search-k", type=int, default=300, help="How many neighbours to fetch before filtering.")
+    parser.add_argument(
+        "--search-k",
+        type=int,
+        help="How many neighbours to fetch before filtering (default: max(200, 50 * top_k), per job in batch mode).",
+    )
+    parser.add_argument(
+        "--mode",
+        choices=["dense", "hybrid"],
+        default="dense",
+        help="'hybrid' fuses BM25 keyword matches with the embedding neighbours (needs titles_bm25.npz).",
+    )
+
+    batch = parser.add_argument_group("batch mode")
+    batch.add_argument("--output", default="-", help="Output path for batch results ('-' for stdout).")
+    batch.add_argument("--output-format", choices=["jsonl", "parquet"], default="jsonl")
+    batch.add_argument("--chunk-size", type=int, default=256, help="Jobs per vectorized FAISS search.")
+    batch.add_argument("--workers", type=int, default=1, help="Chunks processed concurrently.")
+    batch.add_argument(
+        "--progress-every",
+        type=float,
+        default=5.0,
+        help="Seconds between progress reports on stderr (0 disables).",
+    )
     return parser.parse_args()
 
 
+def parse_job(line: str, default_top_k: int) -> Tuple[Any, List[int], FilterParams | None, int]:
+    """
+    Parse one JSONL job into (job_id, seed_ids, filters, top_k); raises ValueError if malformed.
+    """
+    try:
+        job = json.loads(line)
+    except json.JSONDecodeError as exc:
+        raise ValueError(f"Invalid JSON: {exc}") from exc
+    if not isinstance(job, dict):
+        raise ValueError("Job must be a JSON object.")
+
+    seed_ids = job.get("seed_ids")
+    if not isinstance(seed_ids, list) or not seed_ids:
+        raise ValueError("'seed_ids' must be a non-empty list of integers.")
+    if not all(isinstance(x, int) and not isinstance(x, bool) for x in seed_ids):
+        raise ValueError("'seed_ids' must be a non-empty list of integers.")
+    if not all(0 <= x < 2**63 for x in seed_ids):
+        raise ValueError("One or more seed_ids are out of range.")
+
+    top_k = job.get("top_k", default_top_k)
+    if not isinstance(top_k, int) or isinstance(top_k, bool) or top_k < 1:
+        raise ValueError("'top_k' must be a positive integer.")
+
+    raw_filters = job.get("filters") or {}
+    if not isinstance(raw_filters, dict):
+        raise ValueError("'filters' must be a JSON object.")
+
+    def as_list(key: str) -> List[str] | None:
+        value = raw_filters.get(key)
+        if value is None or isinstance(value, str):
+            return parse_list_arg(value)
+        if isinstance(value, list):
+            return [str(v).strip() for v in value if str(v).strip()] or None
+        raise ValueError(f"'filters.{key}' must be a list or comma-separated string.")
+
+    def as_year(key: str) -> int | None:
+        value = raw_filters.get(key)
+        if value is not None and (not isinstance(value, int) or isinstance(value, bool)):
+            raise ValueError(f"'filters.{key}' must be an integer.")
+        return value
+
+    filters = FilterParams(
+        platform=as_list("platforms"),
+        type=as_list("types"),
+        country=as_list("countries"),
+        min_year=as_year("min_year"),
+        max_year=as_year("max_year"),
+    )
+    return job.get("id"), seed_ids, filters, top_k
+
+
+def metadata_columns(recommender: MovieRecommender) -> Dict[str, list]:
+    """
+    Plain-Python copies of the result columns so batch jobs avoid per-row pandas overhead.
+    """
+    metadata = recommender.metadata
+    columns = {
+        col: metadata[col].tolist()
+        for col in RESULT_COLUMNS
+        if col in metadata and col not in ("vector_id", "score", "genre_list")
+    }
+    if "genre_list" in metadata:
+        columns["genre_list"] = [normalize_genre_list(value) for value in metadata["genre_list"]]
+    return columns
+
+
+def run_chunk(
+    recommender: MovieRecommender,
+    columns: Dict[str, list],
+    chunk: List[Tuple[int, str]],
+    default_top_k: int,
+    search_k: int | None,
+    mode: str = "dense",
+) -> List[Dict[str, Any]]:
+    records: List[Dict[str, Any]] = [{} for _ in chunk]
+    jobs = []
+    positions = []
+    for pos, (line_no, line) in enumerate(chunk):
+        records[pos] = {"line": line_no, "id": None}
+        try:
+            job_id, seed_ids, filters, top_k = parse_job(line, default_top_k)
+        except ValueError as exc:
+            records[pos]["error"] = str(exc)
+            continue
+        records[pos]["id"] = job_id
+        jobs.append((seed_ids, filters, top_k))
+        positions.append(pos)
+
+    # One vectorized search per search depth; jobs in a chunk usually share their top_k.
+    groups: Dict[int, List[int]] = {}
+    for i, (_seed_ids, _filters, top_k) in enumerate(jobs):
+        groups.setdefault(search_k or default_search_k(top_k), []).append(i)
+
+    for group_k, members in groups.items():
+        try:
+            outcomes = recommender.recommend_batch([jobs[i] for i in members], search_k=group_k, mode=mode)
+        except ShardUnavailableError as exc:
+            outcomes = [exc] * len(members)
+        for i, outcome in zip(members, outcomes):
+            pos = positions[i]
+            if isinstance(outcome, Exception):
+                records[pos]["error"] = str(outcome)
+            else:
+                ids, scores = outcome
+                records[pos]["results"] = [
+                    {"vector_id": int(vid), "score": float(score), **{c: values[vid] for c, values in columns.items()}}
+                    for vid, score in zip(ids.tolist(), scores.tolist())
+                ]
+    return records
+
+
+def read_chunks(stream: IO[str], chunk_size: int) -> Iterator[List[Tuple[int, str]]]:
+    numbered = ((n, line) for n, line in enumerate(stream, start=1) if line.strip())
+    while True:
+        chunk = list(islice(numbered, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def ordered_results(
+    recommender: MovieRecommender,
+    columns: Dict[str, list],
+    chunks: Iterable[List[Tuple[int, str]]],
+    args: argparse.Namespace,
+) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Yield chunk results in input order, keeping at most 2 * workers chunks in flight.
+    """
+    if args.workers <= 1:
+        for chunk in chunks:
+            yield run_chunk(recommender, columns, chunk, args.top_k, args.search_k, args.mode)
+        return
+
+    max_in_flight = 2 * args.workers
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        in_flight = []
+        for chunk in chunks:
+            in_flight.append(pool.submit(run_chunk, recommender, columns, chunk, args.top_k, args.search_k, args.mode))
+            if len(in_flight) >= max_in_flight:
+                yield in_flight.pop(0).result()
+        for future in in_flight:
+            yield future.result()
+
+
+class JsonlSink:
+    def __init__(self, target: str) -> None:
+        self.handle = sys.stdout if target == "-" else open(target, "w", encoding="utf-8")
+
+    def write(self, records: List[Dict[str, Any]]) -> None:
+        for record in records:
+            self.handle.write(json.dumps(record, default=_json_default) + "\n")
+        self.handle.flush()
+
+    def close(self) -> None:
+        if self.handle is not sys.stdout:
+            self.handle.close()
+
+
+class ParquetSink:
+    """
+    Flattens results to one row per recommendation, written as one row group per chunk.
+    """
+
+    def __init__(self, target: str) -> None:
+        if target == "-":
+            raise SystemExit("--output-format parquet requires --output <file>.")
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self.pa = pa
+        self.schema = pa.schema(
+            [
+                ("line", pa.int64()),
+                ("id", pa.string()),
+                ("rank", pa.int32()),
+                ("vector_id", pa.int64()),
+                ("score", pa.float32()),
+                ("title", pa.string()),
+                ("platform", pa.string()),
+                ("type", pa.string()),
+                ("release_year", pa.int64()),
+                ("genre_list", pa.list_(pa.string())),
+                ("error", pa.string()),
+            ]
+        )
+        self.writer = pq.ParquetWriter(target, self.schema)
+
+    def write(self, records: List[Dict[str, Any]]) -> None:
+        rows = []
+        for record in records:
+            base = {"line": record["line"], "id": None if record["id"] is None else str(record["id"])}
+            if "error" in record:
+                rows.append({**base, "error": record["error"]})
+                continue
+            for rank, result in enumerate(record["results"], start=1):
+                rows.append({**base, "rank": rank, **result})
+        self.writer.write_table(self.pa.Table.from_pylist(rows, schema=self.schema))
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+def _json_default(value: Any) -> Any:
+    if hasattr(value, "item"):
+        return value.item()
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def run_batch(recommender: MovieRecommender, args: argparse.Namespace) -> None:
+    stream = sys.stdin if args.batch == "-" else open(args.batch, encoding="utf-8")
+    sink = ParquetSink(args.output) if args.output_format == "parquet" else JsonlSink(args.output)
+
+    columns = metadata_columns(recommender)
+    started = last_report = time.perf_counter()
+    done = failed = 0
+    try:
+        for records in ordered_results(recommender, columns, read_chunks(stream, args.chunk_size), args):
+            sink.write(records)
+            done += len(records)
+            failed += sum("error" in record for record in records)
+            now = time.perf_counter()
+            if args.progress_every and now - last_report >= args.progress_every:
+                last_report = now
+                print(
+                    f"[batch] {done:,} jobs ({failed:,} errors) - {done / (now - started):,.0f} jobs/s",
+                    file=sys.stderr,
+                )
+    finally:
+        sink.close()
+        if stream is not sys.stdin:
+            stream.close()
+
+    elapsed = time.perf_counter() - started
+    rate = done / elapsed if elapsed else 0.0
+    print(f"[batch] done: {done:,} jobs ({failed:,} errors) in {elapsed:.2f}s - {rate:,.0f} jobs/s", file=sys.stderr)
+
+
 def main() -> None:
     args = parse_args()
 
-    recommender = MovieRecommender(
-        embeddings_path=args.embeddings,
-        metadata_path=args.metadata,
-        index_path=args.index,
-    )
+    if args.sharded:
+        recommender: MovieRecommender = ShardedRecommender(metadata_path=args.metadata, lexical_path=args.lexical)
+    else:
+        recommender = MovieRecommender(
+            embeddings_path=args.embeddings,
+            metadata_path=args.metadata,
+            index_path=args.index,
+            lexical_path=args.lexical,
+        )
+    if args.mode == "hybrid" and recommender.lexical is None:
+        raise SystemExit(
+            f"--mode hybrid requires the BM25 index ({args.lexical}); run pipeline/lexical.py first."
+        )
+
+    if args.batch:
+        run_batch(recommender, args)
+        return
 
     filters = FilterParams(
         platform=parse_list_arg(args.platforms),
@@ -49,10 +351,11 @@ def main() -> None:
         seed_ids=args.seed_ids,
         filters=filters,
         top_k=args.top_k,
-        search_k=args.search_k,
+        search_k=args.search_k or default_search_k(args.top_k),
+        mode=args.mode,
     )
 
-    cols = [c for c in ["vector_id", "score", "title", "platform", "type", "release_year", "genre_list"] if c in recs]
+    cols = [c for c in RESULT_COLUMNS if c in recs]
     with pd.option_context("display.max_colwidth", 120):
         print(recs[cols])
 
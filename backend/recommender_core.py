@@ -3,9 +3,12 @@ Core reusable recommender utilities shared by CLI and FastAPI layers.
 """
 from __future__ import annotations
 
+import hashlib
+import threading
+from collections import OrderedDict
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Iterable, List, Sequence
+from typing import Dict, Iterable, List, Sequence, Tuple
 
 import numpy as np
 import pandas as pd
@@ -19,6 +22,16 @@ except ImportError as exc:  # pragma: no cover
         "FAISS is required. Install it with `pip install faiss-cpu` (or faiss-gpu)."
     ) from exc
 
+try:
+    from scipy import sparse
+except ImportError:  # pragma: no cover
+    sparse = None  # type: ignore
+
+SEARCH_MODES = ("dense", "hybrid")
+
+
+MASK_CACHE_SIZE = 256
+
 
 def normalize_genre_list(value: Iterable[str] | str | None) -> List[str]:
     if value is None:
@@ -37,6 +50,25 @@ class FilterParams:
     max_year: int | None = None
 
 
+def filter_key(filters: FilterParams | None) -> tuple:
+    """
+    Hashable, order-insensitive key for a FilterParams (used for caching masks).
+    """
+    if filters is None:
+        filters = FilterParams()
+
+    def norm(values: Sequence[str] | None) -> tuple:
+        return tuple(sorted({v.lower() for v in values})) if values else ()
+
+    return (
+        norm(filters.platform),
+        norm(filters.type),
+        norm(filters.country),
+        filters.min_year,
+        filters.max_year,
+    )
+
+
 def parse_list_arg(value: str | None) -> List[str] | None:
     if not value:
         return None
@@ -45,6 +77,80 @@ def parse_list_arg(value: str | None) -> List[str] | None:
     return cleaned or None
 
 
+def default_search_k(top_k: int) -> int:
+    """
+    Neighbours to fetch before filtering so `top_k` usually survives the filters.
+    """
+    return max(200, top_k * 50)
+
+
+def faiss_io_flags(mmap: bool) -> int:
+    # IO_FLAG_MMAP_IFC maps flat index codes straight from disk (faiss >= 1.10);
+    # older builds silently fall back to a regular heap copy.
+    if not mmap or not hasattr(faiss, "IO_FLAG_MMAP_IFC"):
+        return 0
+    return faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY
+
+
+def artifacts_version(paths: Iterable[Path]) -> str:
+    """
+    Short fingerprint of the artifact files (content of small manifests, size and mtime
+    of the rest); changes whenever any artifact is rebuilt.
+    """
+    digest = hashlib.sha1()
+    for path in paths:
+        if not path.exists():
+            continue
+        stat = path.stat()
+        digest.update(f"{path.name}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+        if path.suffix == ".json":
+            digest.update(path.read_bytes())
+    return digest.hexdigest()[:12]
+
+
+def fuse_rankings(
+    dense_ids: np.ndarray,
+    dense_scores: np.ndarray,
+    lexical_ids: np.ndarray,
+    lexical_scores: np.ndarray,
+    method: str = settings.HYBRID_FUSION,
+    dense_weight: float = settings.HYBRID_DENSE_WEIGHT,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Merge two ranked candidate lists into one, best first.
+
+    "rrf" sums weight / (RRF_K + rank) per list; "weighted" sums min-max normalized
+    scores. Candidates missing from a list contribute nothing for it.
+    """
+    if method == "rrf":
+        dense_part = dense_weight / (settings.RRF_K + np.arange(1, dense_ids.size + 1))
+        lexical_part = (1 - dense_weight) / (settings.RRF_K + np.arange(1, lexical_ids.size + 1))
+    elif method == "weighted":
+        dense_part = dense_weight * _minmax(dense_scores)
+        lexical_part = (1 - dense_weight) * _minmax(lexical_scores)
+    else:
+        raise ValueError(f"Unknown fusion method: {method}")
+
+    ids, inverse = np.unique(np.concatenate([dense_ids, lexical_ids]), return_inverse=True)
+    fused = np.bincount(inverse, weights=np.concatenate([dense_part, lexical_part]))
+    order = np.argsort(-fused, kind="stable")
+    return ids[order], fused[order]
+
+
+def _minmax(scores: np.ndarray) -> np.ndarray:
+    if scores.size == 0:
+        return scores.astype(float)
+    low, high = float(scores.min()), float(scores.max())
+    if high == low:
+        return np.ones(scores.size)
+    return (scores - low) / (high - low)
+
+
+def configure_faiss_threads(num_threads: int) -> None:
+    if num_threads > 0:
+        faiss.omp_set_num_threads(num_threads)
+
+
 class MovieRecommender:
     """
     Wraps embeddings, metadata, and FAISS index for both CLI and API layers.
@@ -55,6 +161,8 @@ class MovieRecommender:
         embeddings_path: Path = settings.EMBEDDINGS_PATH,
         metadata_path: Path = settings.METADATA_PATH,
         index_path: Path = settings.INDEX_PATH,
+        mmap: bool = settings.MMAP_ARTIFACTS,
+        lexical_path: Path | None = settings.LEXICAL_PATH,
     ) -> None:
         if not embeddings_path.exists():
             raise FileNotFoundError(f"Embeddings not found: {embeddings_path}")
@@ -63,19 +171,58 @@ class MovieRecommender:
         if not index_path.exists():
             raise FileNotFoundError(f"FAISS index not found: {index_path}")
 
-        self.embeddings = np.load(embeddings_path).astype("float32", copy=False)
+        mmap_mode = "r" if mmap else None
+        self.embeddings = np.load(embeddings_path, mmap_mode=mmap_mode).astype("float32", copy=False)
         if self.embeddings.ndim != 2:
             raise ValueError("Embeddings must be a 2-D array.")
+        self.num_vectors = self.embeddings.shape[0]
+
+        self._load_metadata(metadata_path)
+        self.index = faiss.read_index(str(index_path), faiss_io_flags(mmap))
+        self._load_lexical(lexical_path)
 
+        self.version = artifacts_version(
+            [
+                index_path.parent / settings.MANIFEST_PATH.name,
+                embeddings_path,
+                metadata_path,
+                index_path,
+                *([lexical_path] if lexical_path is not None else []),
+            ]
+        )
+        self._init_filters()
+
+    def _load_metadata(self, metadata_path: Path) -> None:
         self.metadata = pd.read_parquet(metadata_path).reset_index(drop=True)
         if "vector_id" not in self.metadata.columns:
             raise ValueError("Metadata must contain 'vector_id'.")
-        if len(self.metadata) != self.embeddings.shape[0]:
+        if len(self.metadata) != self.num_vectors:
             raise ValueError(
-                f"Mismatch metadata rows={len(self.metadata)} vs embeddings={self.embeddings.shape[0]}."
+                f"Mismatch metadata rows={len(self.metadata)} vs embeddings={self.num_vectors}."
             )
 
-        self.index = faiss.read_index(str(index_path))
+        if not np.array_equal(self.metadata["vector_id"].to_numpy(), np.arange(len(self.metadata))):
+            raise ValueError("Metadata 'vector_id' must match the embedding row order.")
+
+    def _load_lexical(self, lexical_path: Path | None) -> None:
+        # Optional BM25 matrix (pipeline/lexical.py) for hybrid retrieval.
+        self.lexical = None
+        if sparse is not None and lexical_path is not None and lexical_path.exists():
+            self.lexical = sparse.load_npz(lexical_path).tocsr()
+            if self.lexical.shape[0] != len(self.metadata):
+                raise ValueError(
+                    f"Mismatch metadata rows={len(self.metadata)} vs lexical rows={self.lexical.shape[0]}."
+                )
+            # Term-major copy (inverted index): scoring walks only the postings of query terms.
+            self._postings = self.lexical.T.tocsr()
+
+    def _init_filters(self) -> None:
+        self._lower_columns = {
+            col: self.metadata[col].fillna("").astype(str).str.lower()
+            for col in ("platform", "type", "country")
+        }
+        self._mask_cache: "OrderedDict[tuple, np.ndarray]" = OrderedDict()
+        self._mask_lock = threading.Lock()
 
     def list_titles(self, filters: FilterParams | None = None) -> pd.DataFrame:
         df = self.apply_filters(filters)
@@ -88,75 +235,257 @@ class MovieRecommender:
         if not filters:
             return df.copy()
 
-        mask = pd.Series(True, index=df.index)
+        filtered = df[self.require_mask(filters)].copy()
+        return filtered
+
+    def filter_mask(self, filters: FilterParams | None) -> np.ndarray:
+        """
+        Boolean mask over metadata rows (== vector_ids) for the given filters.
+
+        Masks are cached per distinct filter combination and returned read-only.
+        """
+        key = filter_key(filters)
+        with self._mask_lock:
+            mask = self._mask_cache.get(key)
+            if mask is not None:
+                self._mask_cache.move_to_end(key)
+                return mask
+
+        mask = self._compute_mask(filters)
+        mask.flags.writeable = False
+        with self._mask_lock:
+            self._mask_cache[key] = mask
+            while len(self._mask_cache) > MASK_CACHE_SIZE:
+                self._mask_cache.popitem(last=False)
+        return mask
+
+    def _compute_mask(self, filters: FilterParams | None) -> np.ndarray:
+        df = self.metadata
+        mask = np.ones(len(df), dtype=bool)
+        if not filters:
+            return mask
+
         if filters.platform:
             platforms = {p.lower() for p in filters.platform}
-            mask &= df["platform"].fillna("").str.lower().isin(platforms)
+            mask &= self._lower_columns["platform"].isin(platforms).to_numpy()
         if filters.type:
             allowed_types = {t.lower() for t in filters.type}
-            mask &= df["type"].fillna("").str.lower().isin(allowed_types)
+            mask &= self._lower_columns["type"].isin(allowed_types).to_numpy()
         if filters.country:
-            targets = {c.lower() for c in filters.country}
-            mask &= df["country"].fillna("").str.lower().apply(
-                lambda countries: any(target in countries for target in targets)
-            )
+            countries = self._lower_columns["country"]
+            country_mask = np.zeros(len(df), dtype=bool)
+            for target in {c.lower() for c in filters.country}:
+                country_mask |= countries.str.contains(target, regex=False).to_numpy()
+            mask &= country_mask
         if filters.min_year is not None:
-            mask &= df["release_year"].fillna(0) >= filters.min_year
+            mask &= (df["release_year"].fillna(0) >= filters.min_year).to_numpy()
         if filters.max_year is not None:
-            mask &= df["release_year"].fillna(0) <= filters.max_year
+            mask &= (df["release_year"].fillna(0) <= filters.max_year).to_numpy()
+        return mask
 
-        filtered = df[mask].copy()
-        if filtered.empty:
+    def require_mask(self, filters: FilterParams | None) -> np.ndarray:
+        """
+        Like `filter_mask`, but raises ValueError when nothing matches.
+        """
+        mask = self.filter_mask(filters)
+        if not mask.any():
             raise ValueError("No titles match the selected filters.")
-        return filtered
+        return mask
 
     def _average_seed_vector(self, seed_ids: Sequence[int]) -> np.ndarray:
-        seed_ids_arr = np.array(seed_ids, dtype=int)
-        if (seed_ids_arr < 0).any() or (seed_ids_arr >= self.embeddings.shape[0]).any():
+        try:
+            seed_ids_arr = np.array(seed_ids, dtype=np.int64)
+        except OverflowError as exc:
+            raise ValueError("One or more seed_ids are out of range.") from exc
+        if seed_ids_arr.size == 0:
+            raise ValueError("At least one seed_id is required.")
+        if (seed_ids_arr < 0).any() or (seed_ids_arr >= self.num_vectors).any():
             raise ValueError("One or more seed_ids are out of range.")
 
-        vectors = self.embeddings[seed_ids_arr]
+        vectors = self._seed_vectors(seed_ids_arr)
         mean_vec = vectors.mean(axis=0)
         norm = np.linalg.norm(mean_vec)
         if norm == 0:
             raise ValueError("Seed vectors collapsed to zero; check embeddings.")
         return (mean_vec / norm).astype("float32")
 
+    def _seed_vectors(self, seed_ids: np.ndarray) -> np.ndarray:
+        return self.embeddings[seed_ids]
+
+    def _search(self, queries: np.ndarray, search_k: int) -> Tuple[np.ndarray, np.ndarray, bool]:
+        """
+        (scores, ids, complete) for the top `search_k`; `complete` is False when part
+        of the index did not answer (see ShardedRecommender), so callers must not cache.
+        """
+        k = min(search_k, self.num_vectors)
+        scores, ids = self.index.search(np.ascontiguousarray(queries, dtype="float32"), k)
+        return scores, ids, True
+
+    def _lexical_scores(self, seed_id_sets: Sequence[Sequence[int]]) -> np.ndarray:
+        """
+        BM25 score of every title against the distinct terms of each seed set,
+        as a (len(seed_id_sets), num_titles) array: two sparse products per batch.
+        """
+        lengths = [len(seeds) for seeds in seed_id_sets]
+        rows = np.repeat(np.arange(len(seed_id_sets)), lengths)
+        cols = np.concatenate([np.asarray(seeds, dtype=np.int64) for seeds in seed_id_sets])
+        selector = sparse.csr_matrix(
+            (np.ones(cols.size, dtype=np.float32), (rows, cols)),
+            shape=(len(seed_id_sets), self.lexical.shape[0]),
+        )
+        query_terms = selector @ self.lexical
+        query_terms.data[:] = 1.0  # each distinct seed term counts once
+        return (query_terms @ self._postings).toarray()
+
+    def _search_many(
+        self,
+        queries: np.ndarray,
+        seed_id_sets: Sequence[Sequence[int]],
+        masks: Sequence[np.ndarray],
+        search_k: int,
+        mode: str,
+    ) -> Tuple[List[Tuple[np.ndarray, np.ndarray]], bool]:
+        """
+        Ranked (ids, scores) candidates per query: FAISS alone, or FAISS fused with
+        the BM25 candidates in hybrid mode. Hybrid lists are fused over the same
+        candidate set (each mask, seeds removed), so ranks and min-max ranges compare.
+        Also returns whether the whole index answered (see `_search`).
+        """
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"Unknown search mode '{mode}'; expected one of {SEARCH_MODES}.")
+        if mode == "hybrid" and self.lexical is None:
+            raise ValueError("Hybrid search is unavailable: lexical index not loaded.")
+
+        scores, ids, complete = self._search(queries, search_k)
+        if mode == "dense":
+            return list(zip(ids, scores)), complete
+
+        lexical = self._lexical_scores(seed_id_sets)
+        ranked = []
+        for row, mask in enumerate(masks):
+            seed_ids = seed_id_sets[row]
+            lex_row = np.where(mask, lexical[row], 0.0)
+            lex_row[np.asarray(seed_ids, dtype=np.int64)] = 0.0
+            lex_ids = np.flatnonzero(lex_row)
+            if lex_ids.size > search_k:
+                lex_ids = lex_ids[np.argpartition(-lex_row[lex_ids], search_k - 1)[:search_k]]
+            lex_ids = lex_ids[np.argsort(-lex_row[lex_ids], kind="stable")]
+            dense_ids, dense_scores = self._filter_candidates(ids[row], scores[row], seed_ids, mask)
+            ranked.append(fuse_rankings(dense_ids, dense_scores, lex_ids, lex_row[lex_ids]))
+        return ranked, complete
+
+    def _filter_candidates(
+        self,
+        ids: np.ndarray,
+        scores: np.ndarray,
+        seed_ids: Sequence[int],
+        mask: np.ndarray,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        keep = ids >= 0
+        keep[keep] = mask[ids[keep]]
+        keep &= ~np.isin(ids, np.asarray(seed_ids, dtype=ids.dtype))
+        return ids[keep], scores[keep]
+
+    def _select_ids(
+        self,
+        ids: np.ndarray,
+        scores: np.ndarray,
+        seed_ids: Sequence[int],
+        mask: np.ndarray,
+        top_k: int,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        ids, scores = self._filter_candidates(ids, scores, seed_ids, mask)
+        if ids.size == 0:
+            raise ValueError("No recommendations found. Try relaxing filters.")
+        return ids[:top_k], scores[:top_k]
+
+    def ranked_candidates(
+        self,
+        seed_ids: Sequence[int],
+        filters: FilterParams | None,
+        search_k: int,
+        mode: str = "dense",
+    ) -> Tuple[np.ndarray, np.ndarray, bool, bool]:
+        """
+        Every filtered candidate from a `search_k`-deep search, best first, plus
+        whether the search already covered the whole index (nothing more to find)
+        and whether every part of the index answered (partial lists must not be cached).
+        """
+        mask = self.require_mask(filters)
+        query = self._average_seed_vector(seed_ids)
+        search_k = min(search_k, self.num_vectors)
+        ranked, complete = self._search_many(query[np.newaxis, :], [seed_ids], [mask], search_k, mode)
+        ids, scores = self._filter_candidates(*ranked[0], seed_ids, mask)
+        return ids, scores, search_k >= self.num_vectors, complete
+
+    def rows_for(self, ids: np.ndarray, scores: np.ndarray) -> pd.DataFrame:
+        results = self.metadata.iloc[ids].reset_index(drop=True)
+        results["score"] = np.asarray(scores, dtype=float)
+        results["genre_list"] = results["genre_list"].apply(normalize_genre_list)
+        return results
+
     def recommend(
         self,
         seed_ids: Sequence[int],
         filters: FilterParams | None,
         top_k: int,
         search_k: int,
+        mode: str = "dense",
     ) -> pd.DataFrame:
-        filtered = self.apply_filters(filters)
-        filtered_by_id = filtered.set_index("vector_id")
-
+        mask = self.require_mask(filters)
         query = self._average_seed_vector(seed_ids)
-        k = min(search_k, self.embeddings.shape[0])
-        scores, ids = self.index.search(query[np.newaxis, :], k)
-        ids = ids[0]
-        scores = scores[0]
+        ranked, _complete = self._search_many(query[np.newaxis, :], [seed_ids], [mask], search_k, mode)
+        ids, scores = ranked[0]
+        return self.rows_for(*self._select_ids(ids, scores, seed_ids, mask, top_k))
 
-        seed_set = set(int(x) for x in seed_ids)
-        results = []
+    def recommend_batch(
+        self,
+        jobs: Sequence[Tuple[Sequence[int], FilterParams | None, int]],
+        search_k: int,
+        mode: str = "dense",
+    ) -> List[Tuple[np.ndarray, np.ndarray] | ValueError]:
+        """
+        Vectorized `recommend` over many (seed_ids, filters, top_k) jobs.
 
-        for vid, score in zip(ids, scores):
-            vid_int = int(vid)
-            if vid_int in seed_set:
-                continue
-            if vid_int not in filtered_by_id.index:
-                continue
+        Returns the ranked (vector_ids, scores) per job; use `rows_for` to turn them
+        into metadata rows. All valid queries go through a single FAISS search and
+        filter masks are computed once per distinct filter combination. Failing jobs
+        yield their ValueError in place of a result instead of aborting the batch.
+        """
+        outcomes: List[Tuple[np.ndarray, np.ndarray] | ValueError | None] = [None] * len(jobs)
+        masks: Dict[tuple, np.ndarray | ValueError] = {}
+        queries: List[np.ndarray] = []
+        pending: List[Tuple[int, np.ndarray]] = []
 
-            row = filtered_by_id.loc[vid_int].to_dict()
-            row["vector_id"] = vid_int
-            row["score"] = float(score)
-            row["genre_list"] = normalize_genre_list(row.get("genre_list"))
-            results.append(row)
-            if len(results) >= top_k:
-                break
+        for pos, (seed_ids, filters, _top_k) in enumerate(jobs):
+            key = filter_key(filters)
+            if key not in masks:
+                try:
+                    masks[key] = self.require_mask(filters)
+                except ValueError as exc:
+                    masks[key] = exc
+            try:
+                if isinstance(masks[key], ValueError):
+                    raise masks[key]
+                queries.append(self._average_seed_vector(seed_ids))
+            except ValueError as exc:
+                outcomes[pos] = exc
+                continue
+            pending.append((pos, masks[key]))
 
-        if not results:
-            raise ValueError("No recommendations found. Try relaxing filters.")
+        if queries:
+            ranked, _complete = self._search_many(
+                np.vstack(queries),
+                [jobs[pos][0] for pos, _mask in pending],
+                [mask for _pos, mask in pending],
+                search_k,
+                mode,
+            )
+            for (pos, mask), (ids, scores) in zip(pending, ranked):
+                seed_ids, _filters, top_k = jobs[pos]
+                try:
+                    outcomes[pos] = self._select_ids(ids, scores, seed_ids, mask, top_k)
+                except ValueError as exc:
+                    outcomes[pos] = exc
 
-        return pd.DataFrame(results)
+        return outcomes  # type: ignore[return-value]
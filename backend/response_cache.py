@@ -0,0 +1,200 @@
+"""
+Content-encoding negotiation and a cache of precompressed response bodies.
+
+Broad `/api/titles` responses are several megabytes of JSON. The cache keeps the
+serialized body per (route, filters) together with each compressed variant that has
+been requested, so popular responses are served as stored bytes. Entries are tied
+to the recommender's artifact version and dropped when it changes.
+"""
+from __future__ import annotations
+
+import gzip
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, List, Tuple
+
+from fastapi import Response
+
+from . import settings
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None  # type: ignore
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None  # type: ignore
+
+
+def _encoders(br_quality: int, zstd_level: int, gzip_level: int) -> Dict[str, Callable[[bytes], bytes]]:
+    encoders: Dict[str, Callable[[bytes], bytes]] = {}
+    if brotli is not None:
+        encoders["br"] = lambda body: brotli.compress(body, quality=br_quality)
+    if zstandard is not None:
+        encoders["zstd"] = lambda body: zstandard.ZstdCompressor(level=zstd_level).compress(body)
+    encoders["gzip"] = lambda body: gzip.compress(body, compresslevel=gzip_level, mtime=0)
+    return encoders
+
+
+# Server preference order. Cached bodies are compressed once per entry, so favour ratio;
+# one-off bodies (recommendations, title pages, autocomplete) are compressed on every
+# request, so they use fast levels instead.
+ENCODERS = _encoders(br_quality=9, zstd_level=10, gzip_level=9)
+FAST_ENCODERS = _encoders(br_quality=4, zstd_level=3, gzip_level=6)
+
+IDENTITY = "identity"
+
+
+def negotiate_encoding(accept_encoding: str | None) -> str:
+    """
+    Pick the preferred supported encoding allowed by an Accept-Encoding header.
+    """
+    if not accept_encoding:
+        return IDENTITY
+
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name] = q
+
+    candidates: List[Tuple[float, int, str]] = []
+    for rank, name in enumerate(ENCODERS):
+        q = weights.get(name, weights.get("*", 0.0))
+        if q > 0:
+            candidates.append((q, -rank, name))
+    return max(candidates)[2] if candidates else IDENTITY
+
+
+def encode_body(
+    body: bytes, encoding: str, encoders: Dict[str, Callable[[bytes], bytes]] = ENCODERS
+) -> bytes:
+    if encoding == IDENTITY:
+        return body
+    return encoders[encoding](body)
+
+
+def encoded_response(body: bytes, encoding: str, media_type: str = "application/json") -> Response:
+    headers = {"Vary": "Accept, Accept-Encoding"}
+    if encoding != IDENTITY:
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type=media_type, headers=headers)
+
+
+def compressed_response(
+    body: bytes, accept_encoding: str | None, media_type: str = "application/json"
+) -> Response:
+    """
+    One-off (uncached) negotiation for small or per-request bodies, at FAST_ENCODERS levels.
+    """
+    encoding = IDENTITY
+    if len(body) >= settings.COMPRESS_MIN_BYTES:
+        encoding = negotiate_encoding(accept_encoding)
+    return encoded_response(encode_body(body, encoding, FAST_ENCODERS), encoding, media_type)
+
+
+class CompressedResponseCache:
+    """
+    Size-bounded LRU of serialized bodies and their compressed variants.
+
+    Entries present when `pin` is called (the startup warm set) leave the LRU: they
+    are never evicted and their bytes come out of `max_bytes`, so the remaining
+    budget can be split across forked workers while the warm set stays shared.
+    """
+
+    def __init__(self, max_bytes: int = settings.RESPONSE_CACHE_MAX_BYTES) -> None:
+        self.max_bytes = max_bytes
+        self.version: str | None = None
+        self._entries: "OrderedDict[Hashable, Dict[str, bytes]]" = OrderedDict()
+        self._size = 0
+        self._pinned: Dict[Hashable, Dict[str, bytes]] = {}
+        self._pinned_size = 0
+        self._lock = threading.Lock()
+
+    def get(
+        self,
+        version: str,
+        key: Hashable,
+        encoding: str,
+        build_body: Callable[[], bytes],
+    ) -> bytes:
+        """
+        Return the body for `key` encoded with `encoding`, serializing with `build_body`
+        and compressing only on a miss. Exceptions from `build_body` propagate uncached.
+        """
+        with self._lock:
+            if version != self.version:
+                self._entries.clear()
+                self._size = 0
+                self._pinned.clear()
+                self._pinned_size = 0
+                self.version = version
+            variants = self._pinned.get(key)
+            if variants is None:
+                variants = self._entries.get(key)
+                if variants is not None:
+                    self._entries.move_to_end(key)
+            if variants is not None:
+                if encoding in variants:
+                    return variants[encoding]
+                body = variants[IDENTITY]
+
+        if variants is None:
+            body = build_body()
+        encoded = encode_body(body, encoding)
+
+        with self._lock:
+            if version != self.version:
+                return encoded
+            variants = self._entries.setdefault(key, {})
+            if IDENTITY not in variants:
+                variants[IDENTITY] = body
+                self._size += len(body)
+            if encoding not in variants:
+                variants[encoding] = encoded
+                self._size += len(encoded)
+            self._entries.move_to_end(key)
+            self._evict()
+        return encoded
+
+    def pin(self) -> None:
+        """
+        Move every current entry out of the LRU and charge it to the budget once.
+        """
+        with self._lock:
+            self._pinned.update(self._entries)
+            self._pinned_size += self._size
+            self.max_bytes = max(self.max_bytes - self._size, 0)
+            self._entries.clear()
+            self._size = 0
+
+    def resize(self, max_bytes: int) -> None:
+        with self._lock:
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def _evict(self) -> None:
+        while self._size > self.max_bytes and len(self._entries) > 1:
+            _key, variants = self._entries.popitem(last=False)
+            self._size -= sum(len(value) for value in variants.values())
+
+    def stats(self) -> Dict[str, int | str | None]:
+        with self._lock:
+            return {
+                "version": self.version,
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "pinned_entries": len(self._pinned),
+                "pinned_bytes": self._pinned_size,
+            }
@@ -3,7 +3,7 @@ Pydantic request/response schemas for the FastAPI service.
 """
 from __future__ import annotations
 
-from typing import List, Optional
+from typing import List, Literal, Optional
 
 from pydantic import BaseModel, Field
 
@@ -20,6 +20,7 @@ class RecommendRequest(BaseModel):
     seed_ids: List[int]
     filters: FilterPayload
     top_k: int = Field(default=5, ge=1, le=50)
+    mode: Literal["dense", "hybrid"] = "dense"
 
 
 class TitleResponse(BaseModel):
@@ -0,0 +1,145 @@
+"""
+Pre-forking entry point for multi-process serving.
+
+`uvicorn --workers N` spawns fresh interpreters, so every worker re-imports the app
+and loads its own copy of the embeddings, FAISS index and metadata. This module
+loads the recommender once in the parent, binds the listening socket, and then
+forks the workers. Embeddings and index are memory-mapped (settings.MMAP_ARTIFACTS)
+and everything else is shared copy-on-write, so resident memory stays roughly flat
+as workers are added.
+
+Usage:
+    python -m backend.serve --workers 4 --faiss-threads 2
+
+Defaults come from MOVIE_REC_WORKERS / MOVIE_REC_FAISS_THREADS / MOVIE_REC_HOST /
+MOVIE_REC_PORT (see settings.py).
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import os
+import signal
+import socket
+import time
+from typing import Dict
+
+import uvicorn
+
+from . import settings
+from .recommender_core import configure_faiss_threads
+
+RESPAWN_DELAY_SECONDS = 1.0
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Serve the recommender API with pre-forked workers.")
+    parser.add_argument("--host", default=settings.SERVER_HOST)
+    parser.add_argument("--port", type=int, default=settings.SERVER_PORT)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=settings.SERVER_WORKERS,
+        help="Number of worker processes (default: MOVIE_REC_WORKERS or 1).",
+    )
+    parser.add_argument(
+        "--faiss-threads",
+        type=int,
+        default=settings.FAISS_THREADS,
+        help="OpenMP threads per worker for FAISS search; 0 keeps the FAISS default. "
+        "Roughly cores / workers is a good starting point.",
+    )
+    parser.add_argument("--log-level", default="info")
+    return parser.parse_args()
+
+
+def bind_socket(host: str, port: int) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(app, sock: socket.socket, args: argparse.Namespace) -> None:
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    configure_faiss_threads(args.faiss_threads)
+    config = uvicorn.Config(app, log_level=args.log_level)
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def fork_worker(app, sock: socket.socket, args: argparse.Namespace) -> int:
+    pid = os.fork()
+    if pid == 0:
+        exit_code = 0
+        try:
+            run_worker(app, sock, args)
+        except BaseException:  # pragma: no cover - reported by the worker's logger
+            exit_code = 1
+        finally:
+            os._exit(exit_code)
+    return pid
+
+
+def supervise(app, sock: socket.socket, args: argparse.Namespace) -> None:
+    workers: Dict[int, int] = {}
+    stopping = False
+
+    def handle_stop(signum, _frame) -> None:
+        nonlocal stopping
+        stopping = True
+        for pid in list(workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, handle_stop)
+    signal.signal(signal.SIGINT, handle_stop)
+
+    for slot in range(args.workers):
+        workers[fork_worker(app, sock, args)] = slot
+    print(f"Started {args.workers} workers on {args.host}:{args.port} (pids={sorted(workers)})")
+
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:  # pragma: no cover - PEP 475 retries on most platforms
+            continue
+        slot = workers.pop(pid, None)
+        if slot is None or stopping:
+            continue
+        print(f"Worker {pid} exited with status {status}; respawning.")
+        time.sleep(RESPAWN_DELAY_SECONDS)
+        workers[fork_worker(app, sock, args)] = slot
+
+
+def main() -> None:
+    args = parse_args()
+
+    # Importing the app builds the MovieRecommender exactly once, in this process.
+    from .app import app, response_cache
+
+    sock = bind_socket(args.host, args.port)
+    if args.workers <= 1:
+        run_worker(app, sock, args)
+        return
+
+    # Entries cached after fork are private to each worker, so each gets an even share
+    # of what the (pinned, shared) warm set left of MOVIE_REC_RESPONSE_CACHE_MB.
+    response_cache.resize(response_cache.max_bytes // args.workers)
+
+    # Move everything allocated so far into the permanent generation so the cyclic
+    # GC in each worker never writes to (and therefore un-shares) those pages.
+    gc.collect()
+    gc.freeze()
+    supervise(app, sock, args)
+
+
+if __name__ == "__main__":
+    main()
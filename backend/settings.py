@@ -3,11 +3,86 @@ Centralized paths and configuration for the backend modules.
 """
 from __future__ import annotations
 
+import os
 from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parent.parent
-ARTIFACTS_DIR = BASE_DIR / "artifacts"
+ARTIFACTS_ROOT = BASE_DIR / "artifacts"
+
+
+def resolve_artifacts_dir() -> Path:
+    """
+    MOVIE_REC_ARTIFACTS_DIR wins; otherwise serve the build that pipeline/run.py
+    published in artifacts/CURRENT, falling back to the flat artifacts/ layout.
+    """
+    override = os.getenv("MOVIE_REC_ARTIFACTS_DIR")
+    if override:
+        return Path(override)
+    pointer = ARTIFACTS_ROOT / "CURRENT"
+    if pointer.exists():
+        build_dir = ARTIFACTS_ROOT / "builds" / pointer.read_text().strip()
+        if build_dir.is_dir():
+            return build_dir
+    return ARTIFACTS_ROOT
+
+
+ARTIFACTS_DIR = resolve_artifacts_dir()
 
 EMBEDDINGS_PATH = ARTIFACTS_DIR / "title_embeddings.npy"
 METADATA_PATH = ARTIFACTS_DIR / "titles_metadata.parquet"
 INDEX_PATH = ARTIFACTS_DIR / "titles_faiss.index"
+MANIFEST_PATH = ARTIFACTS_DIR / "index_manifest.json"
+LEXICAL_PATH = ARTIFACTS_DIR / "titles_bm25.npz"
+
+# Hybrid (BM25 + dense) retrieval: "rrf" (reciprocal-rank fusion) or "weighted"
+# (min-max normalized scores); DENSE_WEIGHT is the dense share of the fused score.
+HYBRID_FUSION = os.getenv("MOVIE_REC_HYBRID_FUSION", "rrf")
+HYBRID_DENSE_WEIGHT = float(os.getenv("MOVIE_REC_HYBRID_DENSE_WEIGHT", "0.5"))
+RRF_K = 60
+
+# Memory-map embeddings and the FAISS index instead of copying them onto the heap,
+# so forked workers share the same physical pages through the OS page cache.
+MMAP_ARTIFACTS = os.getenv("MOVIE_REC_MMAP", "1") != "0"
+
+# Multi-process serving (see backend/serve.py).
+SERVER_HOST = os.getenv("MOVIE_REC_HOST", "0.0.0.0")
+SERVER_PORT = int(os.getenv("MOVIE_REC_PORT", "8000"))
+SERVER_WORKERS = int(os.getenv("MOVIE_REC_WORKERS", "1"))
+FAISS_THREADS = int(os.getenv("MOVIE_REC_FAISS_THREADS", "0"))  # 0 = FAISS default
+
+# Precompressed response cache (see backend/response_cache.py). The budget is the total
+# for the server: the startup warm set is charged once (it is shared after fork) and
+# backend/serve.py splits the rest evenly across workers, whose caches fill privately.
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("MOVIE_REC_RESPONSE_CACHE_MB", "64")) * 1024 * 1024
+RESPONSE_CACHE_WARMUP = os.getenv("MOVIE_REC_RESPONSE_CACHE_WARMUP", "1") != "0"
+COMPRESS_MIN_BYTES = 1024
+
+# Ranked-candidate lists behind /api/recommend paging cursors (per worker process).
+CURSOR_CACHE_ENTRIES = int(os.getenv("MOVIE_REC_CURSOR_CACHE_ENTRIES", "1024"))
+CURSOR_TTL_SECONDS = float(os.getenv("MOVIE_REC_CURSOR_TTL", "600"))
+CURSOR_CACHE_MAX_BYTES = int(os.getenv("MOVIE_REC_CURSOR_CACHE_MB", "16")) * 1024 * 1024
+# Deepest result a cursor can page to; stored lists are cut there too.
+CURSOR_MAX_DEPTH = int(os.getenv("MOVIE_REC_CURSOR_MAX_DEPTH", "1000"))
+
+# Sharded scatter-gather serving (see backend/shard_server.py); built with
+# `pipeline/indexer.py --shards N`. When enabled the API process holds only
+# metadata and fans searches out to one shard server per shard.
+SHARDS_DIR = ARTIFACTS_DIR / "shards"
+SHARDED = os.getenv("MOVIE_REC_SHARDED", "0") == "1"
+# Owner-only socket directory (checked by both ends); defaults to the per-user
+# runtime dir rather than a guessable path under /tmp.
+SHARD_SOCKET_DIR = Path(
+    os.getenv(
+        "MOVIE_REC_SHARD_SOCKET_DIR",
+        str(
+            Path(os.environ["XDG_RUNTIME_DIR"]) / "movie-rec-shards"
+            if os.getenv("XDG_RUNTIME_DIR")
+            else Path.home() / ".cache" / "movie-rec-shards"
+        ),
+    )
+)
+# Shared secret for the connection handshake; unset, the shard server generates one
+# in SHARD_SOCKET_DIR/authkey.
+SHARD_AUTHKEY = os.getenv("MOVIE_REC_SHARD_AUTHKEY")
+SHARD_TIMEOUT_SECONDS = float(os.getenv("MOVIE_REC_SHARD_TIMEOUT", "2.0"))
+SHARD_ALLOW_PARTIAL = os.getenv("MOVIE_REC_SHARD_ALLOW_PARTIAL", "1") != "0"
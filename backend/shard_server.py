@@ -0,0 +1,280 @@
+"""
+Shard server for sharded scatter-gather search.
+
+Each process loads one shard written by `pipeline/indexer.py --shards N` (a
+contiguous vector_id range with its own embeddings slice and FAISS index) and
+answers requests from `ShardedRecommender` over a Unix socket
+(multiprocessing.connection). Messages are pickled, so both ends insist on an
+owner-only socket directory owned by the current user and authenticate every
+connection with the multiprocessing HMAC handshake (MOVIE_REC_SHARD_AUTHKEY, or a
+key generated in the socket directory). The handshake runs under socket timeouts on
+both sides, so a stalled peer can neither block the accept loop nor hang a query.
+
+Requests are tuples and replies are ("ok", payload) or ("error", message):
+    ("search", queries, k)   -> (scores, ids) with ids in global vector_id space
+    ("vectors", ids)         -> embedding rows for global ids owned by the shard
+    ("info",)                -> {"shard_id", "start", "stop"}
+
+Usage:
+    python -m backend.shard_server                # one process per shard
+    python -m backend.shard_server --shard 2      # a single shard
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing
+import os
+import secrets
+import signal
+import socket
+import stat
+import struct
+import threading
+import time
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Connection, Listener, answer_challenge, deliver_challenge
+from pathlib import Path
+from typing import Any, Dict, Tuple
+
+import numpy as np
+
+from . import settings
+from .recommender_core import configure_faiss_threads, faiss, faiss_io_flags
+
+SHARDS_MANIFEST = "shards.json"
+RESPAWN_DELAY_SECONDS = 1.0
+AUTHKEY_FILE = "authkey"
+# What a failed connect/handshake raises; treated like an unreachable shard.
+CONNECTION_ERRORS = (OSError, EOFError, AuthenticationError)
+
+
+def socket_path(socket_dir: Path, shard_id: int) -> Path:
+    return socket_dir / f"shard-{shard_id:03d}.sock"
+
+
+def ensure_socket_dir(socket_dir: Path, create: bool = False) -> None:
+    """
+    Raise PermissionError unless socket_dir is a directory owned by this user with
+    no group/other permissions (anyone who can reach the sockets could otherwise
+    feed pickles to either end).
+    """
+    if create:
+        socket_dir.mkdir(mode=0o700, parents=True, exist_ok=True)
+    info = socket_dir.lstat()
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid() or info.st_mode & 0o077:
+        raise PermissionError(
+            f"Shard socket dir {socket_dir} must be a directory owned by uid {os.getuid()} "
+            f"with mode 0700 (found uid {info.st_uid}, mode {stat.S_IMODE(info.st_mode):o})."
+        )
+
+
+def load_authkey(socket_dir: Path, create: bool = False) -> bytes:
+    if settings.SHARD_AUTHKEY:
+        return settings.SHARD_AUTHKEY.encode("utf-8")
+    path = socket_dir / AUTHKEY_FILE
+    if create and not path.exists():
+        tmp_path = socket_dir / f".{AUTHKEY_FILE}.{os.getpid()}"
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "wb") as handle:
+            handle.write(secrets.token_hex(32).encode("ascii"))
+        try:
+            os.link(tmp_path, path)  # atomic: a shard starting concurrently may win
+        except FileExistsError:
+            pass
+        finally:
+            tmp_path.unlink()
+    return path.read_bytes()
+
+
+def _set_io_timeout(conn: Connection, seconds: float) -> None:
+    """
+    Kernel-level send/receive timeouts on a blocking connection (0 disables them).
+    """
+    sock = socket.socket(fileno=conn.fileno())
+    try:
+        timeval = struct.pack("ll", int(seconds), int(seconds % 1 * 1_000_000))
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVTIMEO, timeval)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDTIMEO, timeval)
+    finally:
+        sock.detach()
+
+
+def authenticate(conn: Connection, authkey: bytes, timeout: float, server: bool) -> None:
+    """
+    The handshake `Listener`/`Client` run when given an authkey, but bounded by
+    `timeout`; raises one of CONNECTION_ERRORS on failure.
+    """
+    _set_io_timeout(conn, timeout)
+    if server:
+        deliver_challenge(conn, authkey)
+        answer_challenge(conn, authkey)
+    else:
+        answer_challenge(conn, authkey)
+        deliver_challenge(conn, authkey)
+    _set_io_timeout(conn, 0)
+
+
+def connect(address: Path, timeout: float) -> Connection:
+    """
+    Authenticated connection to a shard server, failing within about `timeout`.
+    """
+    ensure_socket_dir(address.parent)
+    authkey = load_authkey(address.parent)
+    with socket.socket(socket.AF_UNIX) as sock:
+        sock.settimeout(timeout)
+        sock.connect(str(address))
+        sock.setblocking(True)
+        conn = Connection(sock.detach())
+    try:
+        authenticate(conn, authkey, timeout, server=False)
+    except BaseException:
+        conn.close()
+        raise
+    return conn
+
+
+def load_shards_manifest(shards_dir: Path) -> Dict[str, Any]:
+    manifest_path = shards_dir / SHARDS_MANIFEST
+    if not manifest_path.exists():
+        raise FileNotFoundError(
+            f"Shard manifest not found: {manifest_path} (build with `pipeline/indexer.py --shards N`)."
+        )
+    return json.loads(manifest_path.read_text())
+
+
+class ShardServer:
+    def __init__(self, shards_dir: Path, shard_id: int, mmap: bool = settings.MMAP_ARTIFACTS) -> None:
+        manifest = load_shards_manifest(shards_dir)
+        shards = {shard["shard_id"]: shard for shard in manifest["shards"]}
+        if shard_id not in shards:
+            raise ValueError(f"Unknown shard {shard_id}; manifest has {sorted(shards)}.")
+        shard = shards[shard_id]
+
+        self.shard_id = shard_id
+        self.start = int(shard["start"])
+        self.stop = int(shard["stop"])
+        mmap_mode = "r" if mmap else None
+        self.embeddings = np.load(shards_dir / shard["embeddings"], mmap_mode=mmap_mode)
+        self.index = faiss.read_index(str(shards_dir / shard["index_file"]), faiss_io_flags(mmap))
+        if self.embeddings.shape[0] != self.stop - self.start or self.index.ntotal != self.stop - self.start:
+            raise ValueError(f"Shard {shard_id} does not match its manifest range.")
+
+    def search(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        k = min(k, self.index.ntotal)
+        scores, ids = self.index.search(np.ascontiguousarray(queries, dtype="float32"), k)
+        return scores, np.where(ids >= 0, ids + self.start, -1)
+
+    def vectors(self, ids: np.ndarray) -> np.ndarray:
+        local = np.asarray(ids, dtype=np.int64) - self.start
+        if (local < 0).any() or (local >= self.embeddings.shape[0]).any():
+            raise ValueError(f"ids outside shard {self.shard_id} [{self.start}, {self.stop}).")
+        return np.asarray(self.embeddings[local], dtype="float32")
+
+    def handle(self, request: Tuple[Any, ...]) -> Any:
+        op = request[0]
+        if op == "search":
+            return self.search(request[1], int(request[2]))
+        if op == "vectors":
+            return self.vectors(request[1])
+        if op == "info":
+            return {"shard_id": self.shard_id, "start": self.start, "stop": self.stop}
+        raise ValueError(f"Unknown request: {op!r}")
+
+    def serve_connection(self, conn: Connection, authkey: bytes) -> None:
+        with conn:
+            try:
+                authenticate(conn, authkey, settings.SHARD_TIMEOUT_SECONDS, server=True)
+            except CONNECTION_ERRORS:
+                return
+            while True:
+                try:
+                    request = conn.recv()
+                except (EOFError, OSError):
+                    return
+                try:
+                    reply: Tuple[str, Any] = ("ok", self.handle(request))
+                except Exception as exc:  # reported to the coordinator, not fatal here
+                    reply = ("error", f"{type(exc).__name__}: {exc}")
+                try:
+                    conn.send(reply)
+                except OSError:
+                    return
+
+    def serve_forever(self, address: Path) -> None:
+        ensure_socket_dir(address.parent, create=True)
+        authkey = load_authkey(address.parent, create=True)
+        address.unlink(missing_ok=True)
+        # No authkey on the Listener: its handshake would run (unbounded) in this
+        # accept loop; each connection thread authenticates with a timeout instead.
+        with Listener(str(address), family="AF_UNIX", backlog=128) as listener:
+            print(f"Shard {self.shard_id} [{self.start}, {self.stop}) listening on {address}", flush=True)
+            while True:
+                conn = listener.accept()
+                threading.Thread(target=self.serve_connection, args=(conn, authkey), daemon=True).start()
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Serve recommender shards over Unix sockets.")
+    parser.add_argument("--shards-dir", type=Path, default=settings.SHARDS_DIR)
+    parser.add_argument("--socket-dir", type=Path, default=settings.SHARD_SOCKET_DIR)
+    parser.add_argument("--shard", type=int, help="Serve only this shard (default: all, one process each).")
+    parser.add_argument(
+        "--faiss-threads",
+        type=int,
+        default=settings.FAISS_THREADS,
+        help="OpenMP threads per shard process; 0 keeps the FAISS default.",
+    )
+    return parser.parse_args()
+
+
+def run_shard(shards_dir: Path, socket_dir: Path, shard_id: int, faiss_threads: int) -> None:
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    configure_faiss_threads(faiss_threads)
+    ShardServer(shards_dir, shard_id).serve_forever(socket_path(socket_dir, shard_id))
+
+
+def main() -> None:
+    args = parse_args()
+    if args.shard is not None:
+        run_shard(args.shards_dir, args.socket_dir, args.shard, args.faiss_threads)
+        return
+
+    shard_ids = [shard["shard_id"] for shard in load_shards_manifest(args.shards_dir)["shards"]]
+    ensure_socket_dir(args.socket_dir, create=True)
+    load_authkey(args.socket_dir, create=True)
+
+    def spawn(shard_id: int) -> multiprocessing.Process:
+        process = multiprocessing.Process(
+            target=run_shard,
+            args=(args.shards_dir, args.socket_dir, shard_id, args.faiss_threads),
+            name=f"shard-{shard_id:03d}",
+        )
+        process.start()
+        return process
+
+    processes: Dict[int, multiprocessing.Process] = {shard_id: spawn(shard_id) for shard_id in shard_ids}
+    stopping = False
+
+    def handle_stop(_signum, _frame) -> None:
+        nonlocal stopping
+        stopping = True
+        for process in processes.values():
+            process.terminate()
+
+    signal.signal(signal.SIGTERM, handle_stop)
+    signal.signal(signal.SIGINT, handle_stop)
+
+    while not stopping:
+        for shard_id, process in list(processes.items()):
+            if not process.is_alive() and not stopping:
+                print(f"Shard {shard_id} exited with status {process.exitcode}; respawning.", flush=True)
+                processes[shard_id] = spawn(shard_id)
+        time.sleep(RESPAWN_DELAY_SECONDS)
+    for process in processes.values():
+        process.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+"""
+Scatter-gather coordinator over shard servers (backend/shard_server.py).
+
+`ShardedRecommender` keeps metadata, filter masks and the optional BM25 matrix in
+the API process, like `MovieRecommender`, but holds no vectors: seed embeddings are
+fetched from the shards that own them and every search is sent to all shards at
+once. Each shard returns its own top-k in global vector_id space and the lists are
+merged by score, which for flat indexes gives exactly the single-index ranking.
+
+A shard that errors or misses MOVIE_REC_SHARD_TIMEOUT is dropped from that query
+and the others' results are used (unless MOVIE_REC_SHARD_ALLOW_PARTIAL=0); only
+when no shard answers does the query fail with `ShardUnavailableError`. Such
+partial searches are reported as incomplete by `_search` so they are not cached.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing.connection import Connection, wait
+from pathlib import Path
+from typing import Any, Dict, List, Sequence, Set, Tuple
+
+import numpy as np
+
+from . import settings
+from .recommender_core import MovieRecommender, artifacts_version
+from .shard_server import (
+    CONNECTION_ERRORS,
+    SHARDS_MANIFEST,
+    connect,
+    load_shards_manifest,
+    socket_path,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class ShardUnavailableError(RuntimeError):
+    pass
+
+
+class ShardClient:
+    """
+    Idle-connection pool for one shard server, reset after fork so worker
+    processes never share a socket with their parent.
+    """
+
+    def __init__(self, shard: Dict[str, Any], address: Path) -> None:
+        self.shard_id = int(shard["shard_id"])
+        self.start = int(shard["start"])
+        self.stop = int(shard["stop"])
+        self.address = address
+        self._idle: List[Connection] = []
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+
+    def idle(self) -> Connection | None:
+        with self._lock:
+            if self._pid != os.getpid():
+                self._idle = []
+                self._pid = os.getpid()
+            return self._idle.pop() if self._idle else None
+
+    def release(self, conn: Connection) -> None:
+        with self._lock:
+            if self._pid == os.getpid():
+                self._idle.append(conn)
+                return
+        conn.close()
+
+
+class ShardedRecommender(MovieRecommender):
+    def __init__(
+        self,
+        shards_dir: Path = settings.SHARDS_DIR,
+        metadata_path: Path = settings.METADATA_PATH,
+        socket_dir: Path = settings.SHARD_SOCKET_DIR,
+        lexical_path: Path | None = settings.LEXICAL_PATH,
+        timeout: float = settings.SHARD_TIMEOUT_SECONDS,
+        allow_partial: bool = settings.SHARD_ALLOW_PARTIAL,
+    ) -> None:
+        if not metadata_path.exists():
+            raise FileNotFoundError(f"Metadata not found: {metadata_path}")
+        manifest = load_shards_manifest(shards_dir)
+        self.num_vectors = int(manifest["num_vectors"])
+        self.shards = [
+            ShardClient(shard, socket_path(socket_dir, int(shard["shard_id"])))
+            for shard in sorted(manifest["shards"], key=lambda shard: shard["start"])
+        ]
+        self._starts = np.array([client.start for client in self.shards], dtype=np.int64)
+        self.timeout = timeout
+        self.allow_partial = allow_partial
+
+        self._load_metadata(metadata_path)
+        self._load_lexical(lexical_path)
+        self.version = artifacts_version(
+            [
+                shards_dir / SHARDS_MANIFEST,
+                metadata_path,
+                *([lexical_path] if lexical_path is not None else []),
+            ]
+        )
+        self._init_filters()
+
+    def _connect(
+        self, clients: Sequence[ShardClient]
+    ) -> Tuple[Dict[int, Connection | Exception], Set[int]]:
+        """
+        An idle pooled connection per shard where there is one; the rest are opened
+        and authenticated concurrently, each within the shard timeout, so a shard
+        stalled mid-handshake does not delay connecting to the others. Also returns
+        the shards whose connection came from the pool.
+        """
+        connections: Dict[int, Connection | Exception] = {}
+        missing = []
+        for client in clients:
+            conn = client.idle()
+            if conn is None:
+                missing.append(client)
+            else:
+                connections[client.shard_id] = conn
+        pooled = set(connections)
+        if missing:
+            with ThreadPoolExecutor(max_workers=len(missing)) as pool:
+                futures = {
+                    client.shard_id: pool.submit(connect, client.address, self.timeout) for client in missing
+                }
+            for shard_id, future in futures.items():
+                try:
+                    connections[shard_id] = future.result()
+                except CONNECTION_ERRORS as exc:
+                    connections[shard_id] = exc
+        return connections, pooled
+
+    def _resend(self, client: ShardClient, request: Tuple[Any, ...]) -> Connection | Exception:
+        """
+        Send `request` on a fresh connection, for a pooled one that turned out stale
+        (e.g. the shard restarted since it was pooled).
+        """
+        try:
+            conn = connect(client.address, self.timeout)
+        except CONNECTION_ERRORS as exc:
+            return exc
+        try:
+            conn.send(request)
+        except (OSError, EOFError) as exc:
+            conn.close()
+            return exc
+        return conn
+
+    def _scatter(self, requests: Sequence[Tuple[ShardClient, Tuple[Any, ...]]]) -> Dict[int, Any]:
+        """
+        Send every request before waiting on any reply, then collect replies until
+        the shared deadline. A pooled connection that fails is retried once on a new
+        one; failed or late shards map to their exception.
+        """
+        connections, pooled = self._connect([client for client, _request in requests])
+        deadline = time.monotonic() + self.timeout
+        results: Dict[int, Any] = {}
+        # connection -> (client, request, whether a failure may still be retried)
+        pending: Dict[Connection, Tuple[ShardClient, Tuple[Any, ...], bool]] = {}
+        for client, request in requests:
+            conn = connections[client.shard_id]
+            retry = client.shard_id in pooled
+            if not isinstance(conn, Exception):
+                try:
+                    conn.send(request)
+                except (OSError, EOFError) as exc:
+                    conn.close()
+                    conn = self._resend(client, request) if retry else exc
+                    retry = False
+            if isinstance(conn, Exception):
+                results[client.shard_id] = conn
+                continue
+            pending[conn] = (client, request, retry)
+
+        while pending:
+            remaining = deadline - time.monotonic()
+            ready = wait(list(pending), timeout=remaining) if remaining > 0 else []
+            if not ready:
+                for conn, (client, _request, _retry) in pending.items():
+                    conn.close()  # a late reply would desync the connection
+                    results[client.shard_id] = TimeoutError(f"no reply within {self.timeout}s")
+                break
+            for conn in ready:
+                client, request, retry = pending.pop(conn)
+                try:
+                    status, payload = conn.recv()
+                except (OSError, EOFError) as exc:
+                    conn.close()
+                    fresh = self._resend(client, request) if retry else exc
+                    if isinstance(fresh, Exception):
+                        results[client.shard_id] = fresh
+                    else:
+                        pending[fresh] = (client, request, False)
+                    continue
+                client.release(conn)
+                results[client.shard_id] = payload if status == "ok" else RuntimeError(payload)
+        return results
+
+    def _seed_vectors(self, seed_ids: np.ndarray) -> np.ndarray:
+        owners = np.searchsorted(self._starts, seed_ids, side="right") - 1
+        groups = {owner: np.flatnonzero(owners == owner) for owner in np.unique(owners).tolist()}
+        results = self._scatter(
+            [(self.shards[owner], ("vectors", seed_ids[positions])) for owner, positions in groups.items()]
+        )
+
+        parts = []
+        for owner, positions in groups.items():
+            rows = results[self.shards[owner].shard_id]
+            if isinstance(rows, Exception):
+                # Without every seed vector the query itself is wrong; never go partial here.
+                raise ShardUnavailableError(f"Shard {self.shards[owner].shard_id} unavailable: {rows}")
+            parts.append((positions, rows))
+        vectors = np.empty((seed_ids.size, parts[0][1].shape[1]), dtype="float32")
+        for positions, rows in parts:
+            vectors[positions] = rows
+        return vectors
+
+    def _search(self, queries: np.ndarray, search_k: int) -> Tuple[np.ndarray, np.ndarray, bool]:
+        k = min(search_k, self.num_vectors)
+        queries = np.ascontiguousarray(queries, dtype="float32")
+        results = self._scatter([(client, ("search", queries, k)) for client in self.shards])
+
+        failed = {shard_id: exc for shard_id, exc in results.items() if isinstance(exc, Exception)}
+        if failed:
+            if len(failed) == len(self.shards) or not self.allow_partial:
+                raise ShardUnavailableError(
+                    "Search shards unavailable: "
+                    + ", ".join(f"{shard_id} ({exc})" for shard_id, exc in sorted(failed.items()))
+                )
+            logger.warning("Partial results: shards %s failed (%s)", sorted(failed), failed)
+
+        answered = [results[client.shard_id] for client in self.shards if client.shard_id not in failed]
+        scores = np.hstack([shard_scores for shard_scores, _ids in answered])
+        ids = np.hstack([shard_ids for _scores, shard_ids in answered])
+        # Merge the per-shard top-k lists; stable sort keeps ties in vector_id order.
+        top = np.argsort(-scores, axis=1, kind="stable")[:, :k]
+        return np.take_along_axis(scores, top, axis=1), np.take_along_axis(ids, top, axis=1), not failed
@@ -0,0 +1,122 @@
+"""
+In-memory title autocomplete index built once at startup.
+
+Two sorted numpy string arrays back the lookups: normalized full titles (prefix
+matches via binary search) and (token, row) pairs for word-in-title matches.
+Results are ranked by match tier, then by shorter title, then alphabetically.
+"""
+from __future__ import annotations
+
+import re
+import unicodedata
+from typing import List, Sequence
+
+import numpy as np
+
+_NON_WORD = re.compile(r"[\W_]+")  # Unicode-aware, like pipeline/lexical.py TOKEN_PATTERN
+_PREFIX_END = "\U0010ffff"
+
+EXACT, TITLE_PREFIX, WORD_MATCH = range(3)
+
+
+def normalize_title(text: str | None) -> str:
+    if not text:
+        return ""
+    decomposed = unicodedata.normalize("NFKD", str(text))
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return _NON_WORD.sub(" ", stripped.casefold()).strip()
+
+
+class TitleSearchIndex:
+    def __init__(self, titles: Sequence[str | None]) -> None:
+        normalized = [normalize_title(title) for title in titles]
+
+        order = np.argsort(np.array(normalized, dtype=str), kind="stable")
+        self._titles = np.array(normalized, dtype=str)[order]
+        self._title_rows = order.astype(np.int64)
+
+        token_list: List[str] = []
+        row_list: List[int] = []
+        for row, title in enumerate(normalized):
+            for token in set(title.split()):
+                token_list.append(token)
+                row_list.append(row)
+        tokens = np.array(token_list, dtype=str)
+        rows = np.array(row_list, dtype=np.int64)
+        order = np.lexsort((rows, tokens))
+        self._tokens = tokens[order]
+        self._token_rows = rows[order]
+
+        # Within a tier: shorter titles first, then alphabetical.
+        by_length = sorted(range(len(normalized)), key=lambda row: (len(normalized[row]), normalized[row]))
+        self._tie_rank = np.empty(len(normalized), dtype=np.int64)
+        self._tie_rank[by_length] = np.arange(len(normalized))
+
+    def _range(self, values: np.ndarray, low: str, high: str, side: str = "left") -> slice:
+        start = int(np.searchsorted(values, low, side="left"))
+        stop = int(np.searchsorted(values, high, side=side))
+        return slice(start, stop)
+
+    def _token_postings(self, token: str, prefix: bool) -> np.ndarray:
+        """
+        Rows containing `token` (or a token starting with it); may repeat rows for prefixes.
+        """
+        high = token + _PREFIX_END if prefix else token
+        return self._token_rows[self._range(self._tokens, token, high, side="left" if prefix else "right")]
+
+    def _best(self, rows: np.ndarray, count: int) -> np.ndarray:
+        if rows.size > count:
+            rows = rows[np.argpartition(self._tie_rank[rows], count - 1)[:count]]
+        return rows[np.argsort(self._tie_rank[rows], kind="stable")]
+
+    def search(self, query: str, mask: np.ndarray | None = None, limit: int = 10) -> np.ndarray:
+        """
+        Row ids of the best `limit` matches for `query` among rows allowed by `mask`.
+
+        Tiers (exact title, title prefix, every word matched with the last one as a
+        prefix) are filled in order and later tiers are skipped once `limit` is reached.
+        """
+        normalized = normalize_title(query)
+        if not normalized or limit <= 0:
+            return np.empty(0, dtype=np.int64)
+
+        prefix_span = self._range(self._titles, normalized, normalized + _PREFIX_END)
+        prefix_rows = self._title_rows[prefix_span]
+        is_exact = self._titles[prefix_span] == normalized
+
+        results: List[np.ndarray] = []
+        found = 0
+        for tier in (EXACT, TITLE_PREFIX, WORD_MATCH):
+            if tier == EXACT:
+                rows = prefix_rows[is_exact]
+            elif tier == TITLE_PREFIX:
+                rows = prefix_rows[~is_exact]
+            else:
+                rows = self._word_rows(normalized.split())
+                if found:
+                    rows = rows[~np.isin(rows, np.concatenate(results))]
+            if mask is not None:
+                rows = rows[mask[rows]]
+            if rows.size:
+                best = self._best(rows, limit - found)
+                results.append(best)
+                found += best.size
+            if found >= limit:
+                break
+
+        if not results:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate(results)
+
+    def _word_rows(self, tokens: List[str]) -> np.ndarray:
+        postings = [self._token_postings(token, prefix=False) for token in tokens[:-1]]
+        postings.append(self._token_postings(tokens[-1], prefix=True))
+        postings.sort(key=len)  # start from the rarest token
+        rows = np.unique(postings[0])
+        for other in postings[1:]:
+            if rows.size == 0:
+                break
+            present = np.zeros(self._tie_rank.size, dtype=bool)
+            present[other] = True
+            rows = rows[present[rows]]
+        return rows
@@ -1,4 +1,10 @@
-import type { FilterState, RecommendRequest, TitleResponse } from "../types";
+import type {
+  FilterState,
+  RecommendationPage,
+  RecommendRequest,
+  TitlePage,
+  TitleResponse,
+} from "../types";
 
 const DEFAULT_BASE_URL = "http://127.0.0.1:8000";
 const API_BASE_URL = import.meta.env.VITE_API_BASE_URL || DEFAULT_BASE_URL;
@@ -63,11 +69,41 @@ export const fetchTitles = async (filters: FilterState): Promise<TitleResponse[]
   return handleResponse<TitleResponse[]>(response);
 };
 
+export const fetchTitlePage = async (
+  filters: FilterState,
+  offset: number,
+  limit: number
+): Promise<TitlePage> => {
+  const params = new URLSearchParams(buildQueryParams(filters));
+  params.append("offset", String(offset));
+  params.append("limit", String(limit));
+  const response = await fetch(`${API_BASE_URL}/api/titles/page?${params.toString()}`);
+  const titles = await handleResponse<TitleResponse[]>(response);
+  return { titles, total: Number(response.headers.get("X-Total-Count") ?? titles.length) };
+};
+
+export const searchTitles = async (
+  query: string,
+  filters: FilterState,
+  limit = 24
+): Promise<TitleResponse[]> => {
+  const params = new URLSearchParams(buildQueryParams(filters));
+  params.append("q", query);
+  params.append("limit", String(limit));
+  const response = await fetch(`${API_BASE_URL}/api/titles/search?${params.toString()}`);
+  return handleResponse<TitleResponse[]>(response);
+};
+
+const toRecommendationPage = async (response: Response): Promise<RecommendationPage> => {
+  const titles = await handleResponse<TitleResponse[]>(response);
+  return { titles, nextCursor: response.headers.get("X-Next-Cursor") };
+};
+
 export const fetchRecommendations = async (
   seedIds: number[],
   filters: FilterState,
   topK: number
-): Promise<TitleResponse[]> => {
+): Promise<RecommendationPage> => {
   const body: RecommendRequest = {
     seed_ids: seedIds,
     filters: normalizeFiltersForRequest(filters),
@@ -78,5 +114,14 @@ export const fetchRecommendations = async (
     headers: { "Content-Type": "application/json" },
     body: JSON.stringify(body),
   });
-  return handleResponse<TitleResponse[]>(response);
+  return toRecommendationPage(response);
+};
+
+export const fetchMoreRecommendations = async (
+  cursor: string,
+  topK: number
+): Promise<RecommendationPage> => {
+  const params = new URLSearchParams({ cursor, top_k: String(topK) });
+  const response = await fetch(`${API_BASE_URL}/api/recommend/next?${params.toString()}`);
+  return toRecommendationPage(response);
 };
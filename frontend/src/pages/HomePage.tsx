@@ -3,16 +3,14 @@ import { useEffect, useState } from "react";
 import { useNavigate } from "react-router-dom";
 import heroBg from "../assets/background.png";
 import { FilterDialog } from "../components/FilterDialog";
-import { fetchTitles } from "../api/client";
 import { useAppStore } from "../store/AppStore";
 import type { FilterState } from "../types";
 
 export const HomePage = () => {
   const [dialogOpen, setDialogOpen] = useState(false);
   const navigate = useNavigate();
-  const { filters, setFilteredTitles, setFilters: updateFilters, resetAll } = useAppStore((state) => ({
+  const { filters, setFilters: updateFilters, resetAll } = useAppStore((state) => ({
     filters: state.filters,
-    setFilteredTitles: state.setFilteredTitles,
     setFilters: state.setFilters,
     resetAll: state.resetAll,
   }));
@@ -22,9 +20,7 @@ export const HomePage = () => {
   }, [resetAll]);
 
   const handleApplyFilters = async (newFilters: FilterState) => {
-    const titles = await fetchTitles(newFilters);
     updateFilters(newFilters);
-    setFilteredTitles(titles);
     setDialogOpen(false);
     navigate("/results");
   };
@@ -1,17 +1,26 @@
 import { Button, MessageBar, Title2, Subtitle2, tokens } from "@fluentui/react-components";
-import { useEffect, useRef } from "react";
+import { useEffect, useRef, useState } from "react";
 import { useNavigate } from "react-router-dom";
+import { fetchMoreRecommendations } from "../api/client";
 import { MovieCard } from "../components/MovieCard";
 import { useAppStore } from "../store/AppStore";
 import resultsBg from "../assets/background2.png";
 
+const PAGE_SIZE = 12;
+
 export const RecommendationsPage = () => {
   const navigate = useNavigate();
-  const { recommendations, resetAll } = useAppStore((state) => ({
-    recommendations: state.recommendations,
-    resetAll: state.resetAll,
-  }));
+  const { recommendations, recommendationCursor, appendRecommendations, resetAll } = useAppStore(
+    (state) => ({
+      recommendations: state.recommendations,
+      recommendationCursor: state.recommendationCursor,
+      appendRecommendations: state.appendRecommendations,
+      resetAll: state.resetAll,
+    })
+  );
   const contentRef = useRef<HTMLDivElement | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
+  const [error, setError] = useState<string | null>(null);
 
   useEffect(() => {
     if (!recommendations.length) {
@@ -20,6 +29,21 @@ export const RecommendationsPage = () => {
     }
   }, [recommendations.length, navigate, resetAll]);
 
+  const handleLoadMore = async () => {
+    if (!recommendationCursor) return;
+    setLoadingMore(true);
+    setError(null);
+    try {
+      const page = await fetchMoreRecommendations(recommendationCursor, PAGE_SIZE);
+      appendRecommendations(page.titles, page.nextCursor);
+    } catch (err) {
+      const message = err instanceof Error ? err.message : "Unable to load more recommendations";
+      setError(message);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const handleStartOver = () => {
     resetAll();
     navigate("/");
@@ -84,6 +108,23 @@ export const RecommendationsPage = () => {
             </div>
           )}
 
+          {error && (
+            <MessageBar intent="error" style={{ marginTop: tokens.spacingVerticalM }}>
+              {error}
+            </MessageBar>
+          )}
+
+          {recommendationCursor && (
+            <Button
+              appearance="secondary"
+              style={{ marginTop: tokens.spacingVerticalXXL, marginRight: tokens.spacingHorizontalS }}
+              disabled={loadingMore}
+              onClick={handleLoadMore}
+            >
+              {loadingMore ? "Loading..." : "Load more"}
+            </Button>
+          )}
+
           <Button
             appearance="primary"
             style={{ marginTop: tokens.spacingVerticalXXL }}
@@ -18,16 +18,18 @@ import { useEffect, useMemo, useRef, useState } from "react";
 import { useNavigate } from "react-router-dom";
 import { MovieCard } from "../components/MovieCard";
 import { useAppStore } from "../store/AppStore";
-import { fetchRecommendations } from "../api/client";
+import { fetchRecommendations, fetchTitlePage, searchTitles } from "../api/client";
+import type { TitleResponse } from "../types";
 import resultsBg from "../assets/background2.png";
 
 const ITEMS_PER_PAGE = 6;
+const SEARCH_LIMIT = 24;
+const SEARCH_DEBOUNCE_MS = 200;
 
 export const ResultsPage = () => {
   const navigate = useNavigate();
 
   const {
-    filteredTitles,
     selectedSeedIds,
     toggleSeed,
     clearSeeds,
@@ -35,7 +37,6 @@ export const ResultsPage = () => {
     setRecommendations,
     resetAll,
   } = useAppStore((state) => ({
-    filteredTitles: state.filteredTitles,
     selectedSeedIds: state.selectedSeedIds,
     toggleSeed: state.toggleSeed,
     clearSeeds: state.clearSeeds,
@@ -49,32 +50,71 @@ export const ResultsPage = () => {
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState<string | null>(null);
   const [currentPage, setCurrentPage] = useState(1);
+  const [query, setQuery] = useState("");
+  const [searchResults, setSearchResults] = useState<TitleResponse[] | null>(null);
+  const [catalogTitles, setCatalogTitles] = useState<TitleResponse[]>([]);
+  const [catalogTotal, setCatalogTotal] = useState<number | null>(null);
   const contentRef = useRef<HTMLDivElement | null>(null);
 
   useEffect(() => {
-    if (!filteredTitles.length) {
-      resetAll();
-      navigate("/");
+    const trimmed = query.trim();
+    if (!trimmed) {
+      setSearchResults(null);
+      return;
     }
-  }, [filteredTitles.length, navigate, resetAll]);
+    let cancelled = false;
+    const timer = window.setTimeout(async () => {
+      try {
+        const results = await searchTitles(trimmed, filters, SEARCH_LIMIT);
+        if (!cancelled) setSearchResults(results);
+      } catch (err) {
+        if (!cancelled) setSearchResults([]);
+      }
+    }, SEARCH_DEBOUNCE_MS);
+    return () => {
+      cancelled = true;
+      window.clearTimeout(timer);
+    };
+  }, [query, filters]);
 
   useEffect(() => {
     setCurrentPage(1);
-  }, [filteredTitles.length]);
+  }, [searchResults, filters]);
+
+  // Without a search the catalog is paged server-side, one page per request.
+  useEffect(() => {
+    if (searchResults) return;
+    let cancelled = false;
+    fetchTitlePage(filters, (currentPage - 1) * ITEMS_PER_PAGE, ITEMS_PER_PAGE)
+      .then((page) => {
+        if (cancelled) return;
+        setCatalogTitles(page.titles);
+        setCatalogTotal(page.total);
+      })
+      .catch((err) => {
+        if (!cancelled) setError(err instanceof Error ? err.message : "Unable to load titles");
+      });
+    return () => {
+      cancelled = true;
+    };
+  }, [filters, currentPage, searchResults]);
+
+  const totalTitles = searchResults ? searchResults.length : catalogTotal ?? 0;
 
   useEffect(() => {
     contentRef.current?.scrollIntoView({ behavior: "smooth", block: "start" });
   }, [currentPage]);
 
-  const totalPages = Math.max(1, Math.ceil(filteredTitles.length / ITEMS_PER_PAGE));
+  const totalPages = Math.max(1, Math.ceil(totalTitles / ITEMS_PER_PAGE));
 
   const pagedTitles = useMemo(() => {
+    if (!searchResults) return catalogTitles;
     const start = (currentPage - 1) * ITEMS_PER_PAGE;
-    return filteredTitles.slice(start, start + ITEMS_PER_PAGE);
-  }, [currentPage, filteredTitles]);
+    return searchResults.slice(start, start + ITEMS_PER_PAGE);
+  }, [currentPage, searchResults, catalogTitles]);
 
-  const showingStart = filteredTitles.length ? (currentPage - 1) * ITEMS_PER_PAGE + 1 : 0;
-  const showingEnd = Math.min(currentPage * ITEMS_PER_PAGE, filteredTitles.length);
+  const showingStart = totalTitles ? (currentPage - 1) * ITEMS_PER_PAGE + 1 : 0;
+  const showingEnd = Math.min(currentPage * ITEMS_PER_PAGE, totalTitles);
 
   const handlePageChange = (page: number) => {
     if (page < 1 || page > totalPages) return;
@@ -89,8 +129,8 @@ export const ResultsPage = () => {
       const parsed = Number.parseInt(topK, 10);
       const safeTopK = Number.isNaN(parsed) ? 12 : Math.min(50, Math.max(1, parsed));
 
-      const recs = await fetchRecommendations(selectedSeedIds, filters, safeTopK);
-      setRecommendations(recs);
+      const page = await fetchRecommendations(selectedSeedIds, filters, safeTopK);
+      setRecommendations(page.titles, page.nextCursor);
       navigate("/recommendations");
     } catch (err) {
       const message = err instanceof Error ? err.message : "Unable to fetch recommendations";
@@ -154,6 +194,14 @@ export const ResultsPage = () => {
             </Subtitle2>
           </div>
 
+          <Input
+            type="search"
+            placeholder="Search titles..."
+            value={query}
+            onChange={(_, data) => setQuery(data.value)}
+            style={{ width: "100%", marginBottom: tokens.spacingVerticalM }}
+          />
+
           <div className="action-bar">
             <div className="selected-count">
               <Badge appearance="filled" color="brand">
@@ -220,10 +268,10 @@ export const ResultsPage = () => {
             ))}
           </div>
 
-          {filteredTitles.length ? (
+          {totalTitles ? (
             <div className="pagination">
               <Body1>
-                Showing {showingStart}-{showingEnd} of {filteredTitles.length}
+                Showing {showingStart}-{showingEnd} of {totalTitles}
               </Body1>
 
               <div className="pagination-controls">
@@ -262,11 +310,13 @@ export const ResultsPage = () => {
                 </Button>
               </div>
             </div>
-          ) : (
+          ) : searchResults || catalogTotal !== null ? (
             <MessageBar intent="warning" style={{ marginTop: tokens.spacingVerticalL }}>
-              No titles match the selected filters. Please adjust filters from the home page.
+              {searchResults
+                ? "No titles match your search."
+                : "No titles match the selected filters. Please adjust filters from the home page."}
             </MessageBar>
-          )}
+          ) : null}
         </div>
       </div>
     </div>
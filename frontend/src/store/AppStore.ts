@@ -12,14 +12,14 @@ export const defaultFilters: FilterState = {
 
 type AppState = {
   filters: FilterState;
-  filteredTitles: TitleResponse[];
   selectedSeedIds: number[];
   recommendations: TitleResponse[];
+  recommendationCursor: string | null;
   setFilters: (filters: FilterState) => void;
-  setFilteredTitles: (titles: TitleResponse[]) => void;
   toggleSeed: (id: number) => void;
   clearSeeds: () => void;
-  setRecommendations: (titles: TitleResponse[]) => void;
+  setRecommendations: (titles: TitleResponse[], cursor?: string | null) => void;
+  appendRecommendations: (titles: TitleResponse[], cursor: string | null) => void;
   resetAll: () => void;
 };
 
@@ -40,11 +40,10 @@ export const useAppStore = create<AppState>()(
   persist(
     (set, get) => ({
       filters: defaultFilters,
-      filteredTitles: [],
       selectedSeedIds: [],
       recommendations: [],
+      recommendationCursor: null,
       setFilters: (filters) => set({ filters }),
-      setFilteredTitles: (titles) => set({ filteredTitles: titles }),
       toggleSeed: (id) =>
         set((state) => {
           const exists = state.selectedSeedIds.includes(id);
@@ -54,13 +53,19 @@ export const useAppStore = create<AppState>()(
           return { selectedSeedIds };
         }),
       clearSeeds: () => set({ selectedSeedIds: [] }),
-      setRecommendations: (titles) => set({ recommendations: titles }),
+      setRecommendations: (titles, cursor = null) =>
+        set({ recommendations: titles, recommendationCursor: cursor }),
+      appendRecommendations: (titles, cursor) =>
+        set((state) => ({
+          recommendations: [...state.recommendations, ...titles],
+          recommendationCursor: cursor,
+        })),
       resetAll: () =>
         set({
           filters: defaultFilters,
-          filteredTitles: [],
           selectedSeedIds: [],
           recommendations: [],
+          recommendationCursor: null,
         }),
     }),
     {
@@ -68,9 +73,9 @@ export const useAppStore = create<AppState>()(
       storage,
       partialize: (state) => ({
         filters: state.filters,
-        filteredTitles: state.filteredTitles,
         selectedSeedIds: state.selectedSeedIds,
         recommendations: state.recommendations,
+        recommendationCursor: state.recommendationCursor,
       }),
     }
   )
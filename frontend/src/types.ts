@@ -28,3 +28,13 @@ export type RecommendRequest = {
   } | null;
   top_k: number;
 };
+
+export type RecommendationPage = {
+  titles: TitleResponse[];
+  nextCursor: string | null;
+};
+
+export type TitlePage = {
+  titles: TitleResponse[];
+  total: number;
+};
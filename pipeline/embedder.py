@@ -6,23 +6,29 @@ can serve similarity queries without re-processing text each time.
 from __future__ import annotations
 
 import argparse
+import os
+import time
 from pathlib import Path
-from typing import Iterable, List
+from typing import List
 
 import numpy as np
 import pandas as pd
 
-try:
-    from sentence_transformers import SentenceTransformer
-except ImportError as exc:  
-    raise SystemExit() from exc
+from encoder import (
+    DEFAULT_MAX_SEQ_LENGTH,
+    DEFAULT_MODEL,
+    DEFAULT_ONNX_DIR,
+    ENGINES,
+    encode_corpus,
+    load_encoder,
+    title_corpus,
+)
 
 
-DATA_DIR = Path(__file__).resolve().parent
+DATA_DIR = Path(__file__).resolve().parent.parent
 DEFAULT_INPUT = DATA_DIR / "artifacts/titles_clean.parquet"
 DEFAULT_EMBEDDINGS = DATA_DIR / "artifacts/title_embeddings.npy"
 DEFAULT_METADATA = DATA_DIR / "artifacts/titles_metadata.parquet"
-DEFAULT_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
 
 METADATA_COLUMNS = [
     "show_id",
@@ -39,6 +45,7 @@ METADATA_COLUMNS = [
     "search_text",
 ]
 
+
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(
         description="Encode cleaned title metadata into sentence embeddings."
@@ -83,6 +90,38 @@ def parse_args() -> argparse.Namespace:
         action=argparse.BooleanOptionalAction,
         help="L2-normalize embeddings for cosine similarity (default: True).",
     )
+    parser.add_argument(
+        "--engine",
+        choices=ENGINES,
+        default="torch",
+        help="Inference engine: PyTorch SentenceTransformer, exported ONNX Runtime, "
+        "or dynamically int8-quantized ONNX (default: torch).",
+    )
+    parser.add_argument(
+        "--onnx-dir",
+        type=Path,
+        default=DEFAULT_ONNX_DIR,
+        help="Directory holding the exported ONNX models and tokenizer (reused if present).",
+    )
+    parser.add_argument(
+        "--max-seq-length",
+        type=int,
+        default=DEFAULT_MAX_SEQ_LENGTH,
+        help="Token truncation length for the ONNX engines (match the model's max_seq_length).",
+    )
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        help="Never touch the network; --model must be a local path or an already cached model.",
+    )
+    parser.add_argument(
+        "--parity-check",
+        type=int,
+        default=0,
+        metavar="N",
+        help="Encode the first N texts with torch and --engine, then report cosine similarity "
+        "and throughput of both instead of writing outputs.",
+    )
     return parser.parse_args()
 
 
@@ -95,54 +134,6 @@ def load_clean_titles(path: Path) -> pd.DataFrame:
     return df
 
 
-def normalize_text(series: pd.Series) -> pd.Series:
-    return (
-        series.fillna("")
-        .astype(str)
-        .str.replace(r"\s+", " ", regex=True)
-        .str.strip()
-    )
-
-
-def build_corpus(
-    df: pd.DataFrame,
-    text_column: str,
-    fallback_columns: Iterable[str],
-) -> List[str]:
-    """
-    Build the list of texts to embed.
-
-    Primary text source: df[text_column]
-    Fallbacks: sequentially fill empty strings with fallback columns.
-    """
-    if text_column not in df.columns:
-        raise SystemExit(f"Column '{text_column}' not found in dataset.")
-
-    corpus = normalize_text(df[text_column])
-
-    for col in fallback_columns:
-        if col not in df.columns:
-            continue
-        fallback = normalize_text(df[col])
-        corpus = corpus.mask(corpus.eq(""), fallback)
-
-    # Ensure no NaNs remain
-    return corpus.fillna("").tolist()
-
-
-def texts_validate(texts: List[str]) -> List[str]:
-    """
-    Final pass to ensure each item is a string.
-    """
-    cleaned: List[str] = []
-    for t in texts:
-        if t is None:
-            cleaned.append("")
-        else:
-            cleaned.append(str(t).strip())
-    return cleaned
-
-
 def prepare_metadata(df: pd.DataFrame) -> pd.DataFrame:
     available = [col for col in METADATA_COLUMNS if col in df.columns]
     if not available:
@@ -153,21 +144,31 @@ def prepare_metadata(df: pd.DataFrame) -> pd.DataFrame:
     return metadata
 
 
-def encode_corpus(
-    texts: List[str],
-    model_name: str,
-    batch_size: int,
-    normalize: bool,
-) -> np.ndarray:
-    model = SentenceTransformer(model_name)
-    embeddings = model.encode(
-        texts,
-        batch_size=batch_size,
-        convert_to_numpy=True,
-        show_progress_bar=True,
-        normalize_embeddings=normalize,
+def parity_check(texts: List[str], args: argparse.Namespace) -> None:
+    """
+    Compare --engine against the PyTorch reference on a sample of the corpus.
+    """
+    timings = {}
+    outputs = {}
+    for engine in dict.fromkeys(["torch", args.engine]):
+        # Export/quantize/load and one warm-up batch happen before the timed encode.
+        encoder = load_encoder(args.model, engine, args.onnx_dir, args.max_seq_length, args.offline)
+        encoder.encode(texts[: args.batch_size], batch_size=args.batch_size, normalize=args.normalize)
+        started = time.perf_counter()
+        outputs[engine] = encoder.encode(texts, batch_size=args.batch_size, normalize=args.normalize)
+        timings[engine] = time.perf_counter() - started
+
+    ref = outputs["torch"]
+    other = outputs[args.engine]
+    cosine = (ref * other).sum(axis=1) / (
+        np.linalg.norm(ref, axis=1) * np.linalg.norm(other, axis=1) + 1e-12
+    )
+    for engine, seconds in timings.items():
+        print(f"{engine:>10}: {len(texts) / seconds:,.1f} texts/s ({seconds:.2f}s for {len(texts):,})")
+    print(
+        f"Cosine(torch, {args.engine}): mean={cosine.mean():.6f} min={cosine.min():.6f} "
+        f"speedup={timings['torch'] / timings[args.engine]:.2f}x"
     )
-    return embeddings.astype("float32", copy=False)
 
 
 def save_outputs(
@@ -185,25 +186,31 @@ def save_outputs(
 
 def main() -> None:
     args = parse_args()
+    if args.offline:
+        os.environ["HF_HUB_OFFLINE"] = "1"
+        os.environ["TRANSFORMERS_OFFLINE"] = "1"
 
     df = load_clean_titles(args.input)
 
     # Build corpus from the original dataframe to avoid accidental column drops
-    corpus = build_corpus(
-        df,
-        text_column=args.text_column,
-        fallback_columns=["title", "description"],
-    )
-    corpus = texts_validate(corpus)
+    corpus = title_corpus(df, text_column=args.text_column)
+
+    if args.parity_check:
+        parity_check(corpus[: args.parity_check], args)
+        return
 
     metadata = prepare_metadata(df)
 
-    print(f"Loaded {len(metadata):,} titles. Encoding with {args.model} ...")
+    print(f"Loaded {len(metadata):,} titles. Encoding with {args.model} ({args.engine}) ...")
     embeddings = encode_corpus(
         texts=corpus,  
         model_name=args.model,
         batch_size=args.batch_size,
         normalize=args.normalize,
+        engine=args.engine,
+        onnx_dir=args.onnx_dir,
+        max_seq_length=args.max_seq_length,
+        local_only=args.offline,
     )
 
     if embeddings.shape[0] != len(metadata):
@@ -0,0 +1,291 @@
+"""
+Sentence encoding for the title corpus: corpus text preparation, the PyTorch and
+ONNX Runtime encoders, and ONNX export/quantization.
+
+Everything that determines the embedding values lives here, so the pipeline's embed
+stage is keyed on this module alone (see pipeline/run.py).
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+from pathlib import Path
+from typing import Iterable, List
+
+import numpy as np
+import pandas as pd
+
+
+DATA_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_ONNX_DIR = DATA_DIR / "artifacts/onnx"
+DEFAULT_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+DEFAULT_MAX_SEQ_LENGTH = 256  # all-MiniLM-L6-v2's sentence-transformers truncation length
+
+ENGINES = ["torch", "onnx", "onnx-int8"]
+ONNX_FP32_FILE = "model.onnx"
+ONNX_INT8_FILE = "model.int8.onnx"
+ONNX_EXPORT_INFO = "export_info.json"
+# Filled in, in order, where the text column is empty.
+CORPUS_FALLBACK_COLUMNS = ["title", "description"]
+
+
+def normalize_text(series: pd.Series) -> pd.Series:
+    return (
+        series.fillna("")
+        .astype(str)
+        .str.replace(r"\s+", " ", regex=True)
+        .str.strip()
+    )
+
+
+def build_corpus(
+    df: pd.DataFrame,
+    text_column: str,
+    fallback_columns: Iterable[str],
+) -> List[str]:
+    """
+    Build the list of texts to embed.
+
+    Primary text source: df[text_column]
+    Fallbacks: sequentially fill empty strings with fallback columns.
+    """
+    if text_column not in df.columns:
+        raise SystemExit(f"Column '{text_column}' not found in dataset.")
+
+    corpus = normalize_text(df[text_column])
+
+    for col in fallback_columns:
+        if col not in df.columns:
+            continue
+        fallback = normalize_text(df[col])
+        corpus = corpus.mask(corpus.eq(""), fallback)
+
+    # Ensure no NaNs remain
+    return corpus.fillna("").tolist()
+
+
+def title_corpus(df: pd.DataFrame, text_column: str) -> List[str]:
+    """
+    The texts embedded for each title (one per row of df).
+    """
+    return texts_validate(build_corpus(df, text_column, fallback_columns=CORPUS_FALLBACK_COLUMNS))
+
+
+def texts_validate(texts: List[str]) -> List[str]:
+    """
+    Final pass to ensure each item is a string.
+    """
+    cleaned: List[str] = []
+    for t in texts:
+        if t is None:
+            cleaned.append("")
+        else:
+            cleaned.append(str(t).strip())
+    return cleaned
+
+
+def _file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as handle:
+        for chunk in iter(lambda: handle.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def model_id(model: str) -> str:
+    """
+    Hub ids are recorded as-is; local model files/directories also get a content hash,
+    so editing the files under a local --model path changes the id.
+    """
+    local = Path(model)
+    if not local.exists():
+        return model
+    if local.is_file():
+        return f"{local.name}@sha256:{_file_sha256(local)[:16]}"
+    digest = hashlib.sha256()
+    for item in sorted(p for p in local.rglob("*") if p.is_file()):
+        digest.update(item.relative_to(local).as_posix().encode())
+        digest.update(_file_sha256(item).encode())
+    return f"{local.name}@sha256:{digest.hexdigest()[:16]}"
+
+
+class TorchEncoder:
+    def __init__(self, model_name: str, local_only: bool) -> None:
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError as exc:
+            raise SystemExit("The torch engine requires `pip install sentence-transformers`.") from exc
+        self.model = SentenceTransformer(model_name, local_files_only=local_only)
+
+    def encode(self, texts: List[str], batch_size: int, normalize: bool) -> np.ndarray:
+        embeddings = self.model.encode(
+            texts,
+            batch_size=batch_size,
+            convert_to_numpy=True,
+            show_progress_bar=True,
+            normalize_embeddings=normalize,
+        )
+        return embeddings.astype("float32", copy=False)
+
+
+def load_encoder(
+    model_name: str,
+    engine: str = "torch",
+    onnx_dir: Path = DEFAULT_ONNX_DIR,
+    max_seq_length: int = DEFAULT_MAX_SEQ_LENGTH,
+    local_only: bool = False,
+) -> "TorchEncoder | OnnxEncoder":
+    """
+    Load (exporting/quantizing first if needed) an encoder exposing `.encode(texts, batch_size, normalize)`.
+    """
+    if engine == "torch":
+        return TorchEncoder(model_name, local_only=local_only)
+    model_path = ensure_onnx_model(model_name, onnx_dir, quantized=engine == "onnx-int8", local_only=local_only)
+    return OnnxEncoder(model_path, tokenizer_dir=onnx_dir, max_seq_length=max_seq_length)
+
+
+def encode_corpus(
+    texts: List[str],
+    model_name: str,
+    batch_size: int,
+    normalize: bool,
+    engine: str = "torch",
+    onnx_dir: Path = DEFAULT_ONNX_DIR,
+    max_seq_length: int = DEFAULT_MAX_SEQ_LENGTH,
+    local_only: bool = False,
+) -> np.ndarray:
+    encoder = load_encoder(model_name, engine, onnx_dir, max_seq_length, local_only)
+    return encoder.encode(texts, batch_size=batch_size, normalize=normalize)
+
+
+def ensure_onnx_model(model_name: str, onnx_dir: Path, quantized: bool, local_only: bool) -> Path:
+    """
+    Export the transformer to ONNX (and optionally int8-quantize it) unless an export
+    of the same model (by `model_id`, i.e. content hash for local directories) already
+    exists in onnx_dir.
+    """
+    fp32_path = onnx_dir / ONNX_FP32_FILE
+    int8_path = onnx_dir / ONNX_INT8_FILE
+    info_path = onnx_dir / ONNX_EXPORT_INFO
+
+    exported_for = json.loads(info_path.read_text()).get("model_id") if info_path.exists() else None
+    if exported_for != model_id(model_name) or not fp32_path.exists():
+        export_onnx(model_name, onnx_dir, local_only=local_only)
+        int8_path.unlink(missing_ok=True)
+
+    if not quantized:
+        return fp32_path
+    if not int8_path.exists():
+        try:
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+        except ImportError as exc:
+            raise SystemExit("The onnx-int8 engine requires `pip install onnxruntime onnx`.") from exc
+        print(f"Quantizing {fp32_path.name} -> {int8_path.name} (dynamic int8) ...")
+        quantize_dynamic(str(fp32_path), str(int8_path), weight_type=QuantType.QInt8)
+    return int8_path
+
+
+def onnx_model_sha256(model_name: str, engine: str, onnx_dir: Path, local_only: bool) -> str:
+    """
+    Content hash of what `engine` encodes with from onnx_dir: the ONNX model file
+    (plus its external-data sidecar) and the tokenizer, exporting/quantizing first if
+    onnx_dir has no current export. The other engine's model file is left out.
+    """
+    model_path = ensure_onnx_model(model_name, onnx_dir, quantized=engine == "onnx-int8", local_only=local_only)
+    digest = hashlib.sha256()
+    for item in sorted(p for p in onnx_dir.iterdir() if p.is_file()):
+        if item.name.startswith("model.") and not item.name.startswith(model_path.name):
+            continue
+        digest.update(item.name.encode())
+        digest.update(_file_sha256(item).encode())
+    return digest.hexdigest()
+
+
+def export_onnx(model_name: str, onnx_dir: Path, local_only: bool) -> None:
+    """
+    Export the underlying Hugging Face transformer (token embeddings only); pooling and
+    normalization are applied in numpy by OnnxEncoder, mirroring SentenceTransformer.
+    """
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+
+    onnx_dir.mkdir(parents=True, exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(model_name, local_files_only=local_only)
+    model = AutoModel.from_pretrained(model_name, local_files_only=local_only).eval()
+
+    sample = tokenizer(["onnx export sample"], return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+
+    print(f"Exporting {model_name} -> {onnx_dir / ONNX_FP32_FILE} ...")
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            tuple(sample[name] for name in input_names),
+            str(onnx_dir / ONNX_FP32_FILE),
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=17,
+        )
+    tokenizer.save_pretrained(onnx_dir)
+    info = {"model": model_name, "model_id": model_id(model_name)}
+    (onnx_dir / ONNX_EXPORT_INFO).write_text(json.dumps(info, indent=2))
+
+
+class OnnxEncoder:
+    """
+    ONNX Runtime counterpart of SentenceTransformer.encode: mean pooling over the
+    attention mask followed by optional L2 normalization.
+    """
+
+    def __init__(self, model_path: Path, tokenizer_dir: Path, max_seq_length: int) -> None:
+        try:
+            import onnxruntime as ort
+        except ImportError as exc:
+            raise SystemExit("The onnx engines require `pip install onnxruntime`.") from exc
+        from transformers import AutoTokenizer
+
+        self.tokenizer = AutoTokenizer.from_pretrained(tokenizer_dir, local_files_only=True)
+        self.max_seq_length = max_seq_length
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(
+            str(model_path), sess_options=options, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {inp.name for inp in self.session.get_inputs()}
+
+    def encode(self, texts: List[str], batch_size: int, normalize: bool) -> np.ndarray:
+        # Length-sorted batches keep padding (and wasted compute) to a minimum.
+        order = np.argsort([-len(text) for text in texts], kind="stable")
+        embeddings = np.empty((len(texts), 0), dtype="float32")
+
+        for start in range(0, len(texts), batch_size):
+            batch_idx = order[start : start + batch_size]
+            tokens = self.tokenizer(
+                [texts[i] for i in batch_idx],
+                padding=True,
+                truncation=True,
+                max_length=self.max_seq_length,
+                return_tensors="np",
+            )
+            feeds = {name: tokens[name].astype("int64") for name in self.input_names}
+            hidden = self.session.run(["last_hidden_state"], feeds)[0]
+
+            mask = tokens["attention_mask"][..., np.newaxis].astype("float32")
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            if embeddings.shape[1] == 0:
+                embeddings = np.empty((len(texts), pooled.shape[1]), dtype="float32")
+            embeddings[batch_idx] = pooled
+
+            done = min(start + batch_size, len(texts))
+            if done == len(texts) or (start // batch_size) % 20 == 0:
+                print(f"  encoded {done:,}/{len(texts):,}", end="\r", flush=True)
+        print()
+
+        if normalize:
+            norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            embeddings /= norms
+        return embeddings
@@ -7,6 +7,7 @@ from __future__ import annotations
 
 import argparse
 import json
+import os
 from datetime import datetime, timezone
 from pathlib import Path
 
@@ -21,10 +22,12 @@ except ImportError:  # pragma: no cover
     FAISS_AVAILABLE = False
 
 
-DATA_DIR = Path(__file__).resolve().parent
+DATA_DIR = Path(__file__).resolve().parent.parent
 DEFAULT_EMBEDDINGS = DATA_DIR / "artifacts/title_embeddings.npy"
 DEFAULT_INDEX = DATA_DIR / "artifacts/titles_faiss.index"
 DEFAULT_MANIFEST = DATA_DIR / "artifacts/index_manifest.json"
+DEFAULT_SHARDS_DIR = DATA_DIR / "artifacts/shards"
+SHARDS_MANIFEST = "shards.json"
 
 
 def parse_args() -> argparse.Namespace:
@@ -61,6 +64,18 @@ def parse_args() -> argparse.Namespace:
         action=argparse.BooleanOptionalAction,
         help="Normalize embeddings before saving when using the numpy backend.",
     )
+    parser.add_argument(
+        "--shards",
+        type=int,
+        default=0,
+        help="Also split the vectors into N contiguous shards for scatter-gather serving (faiss only).",
+    )
+    parser.add_argument(
+        "--shards-dir",
+        type=Path,
+        default=DEFAULT_SHARDS_DIR,
+        help="Output directory for the shard indexes and shards.json.",
+    )
     return parser.parse_args()
 
 
@@ -95,6 +110,51 @@ def build_faiss_index(embeddings: np.ndarray):
     return index
 
 
+def relative_to_manifest(path: Path, manifest_path: Path) -> str:
+    """
+    Record artifact paths relative to the manifest so builds stay portable across machines.
+    """
+    return Path(os.path.relpath(path.resolve(), manifest_path.resolve().parent)).as_posix()
+
+
+def write_shards(embeddings: np.ndarray, num_shards: int, shards_dir: Path) -> dict:
+    """
+    Split rows into `num_shards` contiguous vector_id ranges, each with its own
+    embeddings slice and FAISS index, and describe them in shards.json.
+    """
+    num_vectors, dim = embeddings.shape
+    if not 1 <= num_shards <= num_vectors:
+        raise SystemExit(f"--shards must be between 1 and {num_vectors}.")
+
+    bounds = np.linspace(0, num_vectors, num_shards + 1).astype(int)
+    manifest_path = shards_dir / SHARDS_MANIFEST
+    shards = []
+    for shard_id, (start, stop) in enumerate(zip(bounds[:-1], bounds[1:])):
+        shard_dir = shards_dir / f"shard-{shard_id:03d}"
+        shard_dir.mkdir(parents=True, exist_ok=True)
+        vectors = embeddings[start:stop].copy()
+        np.save(shard_dir / "title_embeddings.npy", vectors)
+        faiss.write_index(build_faiss_index(vectors.copy()), str(shard_dir / "titles_faiss.index"))
+        shards.append(
+            {
+                "shard_id": shard_id,
+                "start": int(start),
+                "stop": int(stop),
+                "embeddings": relative_to_manifest(shard_dir / "title_embeddings.npy", manifest_path),
+                "index_file": relative_to_manifest(shard_dir / "titles_faiss.index", manifest_path),
+            }
+        )
+
+    manifest = {
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "num_vectors": int(num_vectors),
+        "vector_dim": int(dim),
+        "shards": shards,
+    }
+    save_manifest(manifest_path, manifest)
+    return manifest
+
+
 def save_manifest(manifest_path: Path, payload: dict) -> None:
     ensure_dir(manifest_path)
     manifest_path.write_text(json.dumps(payload, indent=2))
@@ -111,7 +171,7 @@ def main() -> None:
         faiss.write_index(index, str(args.index_out))  # tạo file titles_faiss.index
         backend_info = {
             "backend": "faiss",
-            "index_file": str(args.index_out),
+            "index_file": relative_to_manifest(args.index_out, args.manifest_out),
         }
     else:
         vectors = embeddings.copy()
@@ -120,13 +180,13 @@ def main() -> None:
         np.save(args.index_out, vectors.astype("float32"))
         backend_info = {
             "backend": "numpy",
-            "index_file": str(args.index_out),
+            "index_file": relative_to_manifest(args.index_out, args.manifest_out),
             "normalized": args.normalize,
         }
 
     manifest = {
         "generated_at": datetime.now(timezone.utc).isoformat(),
-        "source_embeddings": str(args.embeddings),
+        "source_embeddings": relative_to_manifest(args.embeddings, args.manifest_out),
         "num_vectors": int(num_vectors),
         "vector_dim": int(dim),
         **backend_info,
@@ -137,6 +197,12 @@ def main() -> None:
     print(f"Saved index -> {args.index_out}")
     print(f"Saved manifest -> {args.manifest_out}")
 
+    if args.shards:
+        if args.backend != "faiss":
+            raise SystemExit("--shards requires the faiss backend.")
+        write_shards(embeddings, args.shards, args.shards_dir)
+        print(f"Saved {args.shards} shards -> {args.shards_dir}")
+
 
 if __name__ == "__main__":
     main()
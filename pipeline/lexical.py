@@ -0,0 +1,136 @@
+"""
+Build a BM25-weighted sparse term matrix over `search_text` so the recommender can
+match exact cast names and rare title keywords that dense embeddings blur away.
+
+The output is a CSR matrix (rows = vector_id, columns = vocabulary terms) whose
+entries are precomputed BM25 term weights; scoring a query is a single sparse
+matrix-vector product.
+"""
+from __future__ import annotations
+
+import argparse
+import io
+import re
+import zipfile
+from pathlib import Path
+from typing import Dict, Iterable, List
+
+import numpy as np
+import pandas as pd
+
+try:
+    from scipy import sparse
+except ImportError as exc:  # pragma: no cover
+    raise SystemExit("SciPy is required. Install it with `pip install scipy`.") from exc
+
+
+DATA_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_INPUT = DATA_DIR / "artifacts/titles_clean.parquet"
+DEFAULT_OUTPUT = DATA_DIR / "artifacts/titles_bm25.npz"
+
+TOKEN_PATTERN = re.compile(r"[^\W_]{2,}")
+DEFAULT_K1 = 1.2
+DEFAULT_B = 0.75
+NPZ_DATE_TIME = (1980, 1, 1, 0, 0, 0)  # earliest zip timestamp
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Build the BM25 sparse index used for hybrid lexical + semantic retrieval."
+    )
+    parser.add_argument(
+        "--input",
+        type=Path,
+        default=DEFAULT_INPUT,
+        help="Path to titles_clean.parquet generated by preprocess.py.",
+    )
+    parser.add_argument(
+        "--output",
+        type=Path,
+        default=DEFAULT_OUTPUT,
+        help="Destination .npz file for the CSR BM25 matrix.",
+    )
+    parser.add_argument(
+        "--text-column",
+        default="search_text",
+        help="Column to index (default: search_text).",
+    )
+    parser.add_argument("--k1", type=float, default=DEFAULT_K1, help="BM25 term-frequency saturation.")
+    parser.add_argument("--b", type=float, default=DEFAULT_B, help="BM25 length normalization.")
+    return parser.parse_args()
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def build_bm25_matrix(
+    texts: Iterable[str],
+    k1: float = DEFAULT_K1,
+    b: float = DEFAULT_B,
+) -> sparse.csr_matrix:
+    vocab: Dict[str, int] = {}
+    indptr = [0]
+    indices: List[int] = []
+    counts: List[int] = []
+
+    for text in texts:
+        doc_terms: Dict[int, int] = {}
+        for token in tokenize(text or ""):
+            term = vocab.setdefault(token, len(vocab))
+            doc_terms[term] = doc_terms.get(term, 0) + 1
+        indices.extend(doc_terms.keys())
+        counts.extend(doc_terms.values())
+        indptr.append(len(indices))
+
+    tf = sparse.csr_matrix(
+        (np.asarray(counts, dtype=np.float32), np.asarray(indices, dtype=np.int32), np.asarray(indptr)),
+        shape=(len(indptr) - 1, max(len(vocab), 1)),
+    )
+    num_docs = tf.shape[0]
+    doc_len = np.asarray(tf.sum(axis=1)).ravel()
+    avg_len = doc_len.mean() if num_docs else 0.0
+    doc_freq = np.bincount(tf.indices, minlength=tf.shape[1])
+    idf = np.log1p((num_docs - doc_freq + 0.5) / (doc_freq + 0.5)).astype(np.float32)
+
+    # w(t, d) = idf(t) * tf * (k1 + 1) / (tf + k1 * (1 - b + b * |d| / avgdl))
+    row_norm = k1 * (1 - b + b * doc_len / avg_len) if avg_len else np.full(num_docs, k1)
+    row_of_entry = np.repeat(np.arange(num_docs), np.diff(tf.indptr))
+    weights = tf.data * (k1 + 1) / (tf.data + row_norm[row_of_entry]) * idf[tf.indices]
+    bm25 = sparse.csr_matrix((weights.astype(np.float32), tf.indices, tf.indptr), shape=tf.shape)
+    bm25.sort_indices()
+    return bm25
+
+
+def save_matrix(path: Path, matrix: sparse.csr_matrix) -> None:
+    """
+    `sparse.save_npz` with the zip member timestamps pinned, so the same matrix always
+    gives the same bytes (pipeline/run.py versions builds by output hashes).
+    """
+    buffer = io.BytesIO()
+    sparse.save_npz(buffer, matrix)
+    with zipfile.ZipFile(buffer) as src, zipfile.ZipFile(path, "w") as dst:
+        for item in src.infolist():
+            info = zipfile.ZipInfo(item.filename, date_time=NPZ_DATE_TIME)
+            info.compress_type = item.compress_type
+            dst.writestr(info, src.read(item))
+
+
+def title_texts(df: pd.DataFrame, text_column: str) -> pd.Series:
+    return df[text_column].fillna("").astype(str)
+
+
+def main() -> None:
+    args = parse_args()
+    if not args.input.exists():
+        raise SystemExit(f"Input parquet not found: {args.input}")
+    df = pd.read_parquet(args.input, columns=[args.text_column])
+
+    matrix = build_bm25_matrix(title_texts(df, args.text_column), k1=args.k1, b=args.b)
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    save_matrix(args.output, matrix)
+    print(f"Saved BM25 matrix -> {args.output} (shape={matrix.shape}, nnz={matrix.nnz:,})")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,12 +3,13 @@ Preprocess Netflix & Disney+ title metadata into a unified clean dataset.
 """
 from __future__ import annotations
 
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Iterable, List, Tuple
 
 import pandas as pd
 
-DATA_DIR = Path(__file__).resolve().parent
+DATA_DIR = Path(__file__).resolve().parent.parent
 NETFLIX_CSV = DATA_DIR / "Movie_DA/netflix_titles.csv"
 DISNEY_CSV = DATA_DIR / "Movie_DA/disney_plus_titles.csv"
 OUTPUT_PARQUET = DATA_DIR / "artifacts/titles_clean.parquet"
@@ -23,9 +24,11 @@ COUNTRY_ALIAS = {
 TEXT_COLUMNS = ["title", "director", "cast", "description", "listed_in", "country"]
 
 
-def load_raw() -> pd.DataFrame:
-    netflix = pd.read_csv(NETFLIX_CSV)
-    disney = pd.read_csv(DISNEY_CSV)
+def load_raw(netflix_csv: Path = NETFLIX_CSV, disney_csv: Path = DISNEY_CSV) -> pd.DataFrame:
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        netflix_future = pool.submit(pd.read_csv, netflix_csv)
+        disney_future = pool.submit(pd.read_csv, disney_csv)
+        netflix, disney = netflix_future.result(), disney_future.result()
     netflix["platform"] = "Netflix"
     disney["platform"] = "Disney+"
     return pd.concat([disney, netflix], ignore_index=True)
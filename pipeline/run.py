@@ -0,0 +1,432 @@
+"""
+Single entry point for the offline pipeline: preprocess -> (metadata, embed, lexical) -> index (+ shards).
+
+Every stage is keyed by the SHA-256 of its input files, its parameters (including the
+embedding model id) and its own source code. Outputs are cached under
+artifacts/.cache/<stage>/<key>/, so a stage whose key is already there is skipped, and
+stages whose inputs are ready run in parallel. The final artifacts are assembled into
+artifacts/builds/<version>/ with an atomic rename, and artifacts/CURRENT is switched to
+that version; the backend serves whatever CURRENT points at.
+
+Usage:
+    python pipeline/run.py
+    python pipeline/run.py --engine onnx-int8 --model models/all-MiniLM-L6-v2 --offline
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from functools import partial
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Set, Tuple
+
+import numpy as np
+
+import embedder
+import encoder
+import indexer
+import lexical
+import preprocess
+
+PIPELINE_DIR = Path(__file__).resolve().parent
+ROOT_DIR = PIPELINE_DIR.parent
+DEFAULT_ARTIFACTS = ROOT_DIR / "artifacts"
+CURRENT_POINTER = "CURRENT"
+MANIFEST_FILE = "index_manifest.json"
+STAGE_RECORD = "stage.json"
+HASH_CHUNK_BYTES = 1 << 20
+# The served index is inner-product search over unit vectors; part of the embed key.
+EMBED_NORMALIZE = True
+
+InputRef = Path | Tuple[str, str]  # external file, or (stage name, output file)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run the cached preprocess -> embed -> index pipeline.")
+    parser.add_argument("--netflix", type=Path, default=preprocess.NETFLIX_CSV)
+    parser.add_argument("--disney", type=Path, default=preprocess.DISNEY_CSV)
+    parser.add_argument(
+        "--artifacts-dir",
+        type=Path,
+        default=DEFAULT_ARTIFACTS,
+        help="Root holding .cache/, builds/ and the CURRENT pointer.",
+    )
+    parser.add_argument("--model", default=encoder.DEFAULT_MODEL)
+    parser.add_argument("--engine", choices=encoder.ENGINES, default="torch")
+    parser.add_argument("--onnx-dir", type=Path, default=encoder.DEFAULT_ONNX_DIR)
+    parser.add_argument("--max-seq-length", type=int, default=encoder.DEFAULT_MAX_SEQ_LENGTH)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--text-column", default="search_text")
+    parser.add_argument("--offline", action="store_true", help="Load the model from local files only.")
+    parser.add_argument("--workers", type=int, default=4, help="Stages allowed to run concurrently.")
+    parser.add_argument(
+        "--shards",
+        type=int,
+        default=0,
+        help="Also build N index shards (builds/<version>/shards/) for backend.shard_server.",
+    )
+    parser.add_argument(
+        "--force",
+        nargs="*",
+        default=None,
+        metavar="STAGE",
+        help="Rebuild these stages even when cached (no names = all stages).",
+    )
+    parser.add_argument("--keep-builds", type=int, default=3, help="Older build directories to keep.")
+    return parser.parse_args()
+
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as handle:
+        for chunk in iter(lambda: handle.read(HASH_CHUNK_BYTES), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def tree_sha256(path: Path) -> str:
+    """
+    Hash a file, or every file under a directory (relative names included).
+    """
+    if path.is_file():
+        return file_sha256(path)
+    digest = hashlib.sha256()
+    for item in sorted(p for p in path.rglob("*") if p.is_file()):
+        digest.update(item.relative_to(path).as_posix().encode())
+        digest.update(file_sha256(item).encode())
+    return digest.hexdigest()
+
+
+@dataclass
+class Stage:
+    name: str
+    inputs: Dict[str, InputRef]
+    outputs: List[str]
+    run: Callable[[Dict[str, Path], Path], None]
+    params: Dict[str, Any] = field(default_factory=dict)
+    code: List[Path] = field(default_factory=list)
+
+    @property
+    def dependencies(self) -> Set[str]:
+        return {ref[0] for ref in self.inputs.values() if isinstance(ref, tuple)}
+
+
+@dataclass
+class StageResult:
+    name: str
+    key: str
+    out_dir: Path
+    cached: bool
+    seconds: float
+    inputs: Dict[str, str]
+    outputs: Dict[str, str]
+
+
+class PipelineRunner:
+    def __init__(self, stages: List[Stage], artifacts_dir: Path, workers: int, force: Set[str]) -> None:
+        self.stages = stages
+        self.cache_dir = artifacts_dir / ".cache"
+        self.workers = max(1, workers)
+        self.force = force
+
+    def run(self) -> Dict[str, StageResult]:
+        results: Dict[str, StageResult] = {}
+        pending = {stage.name: stage for stage in self.stages}
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            running: Dict[Any, str] = {}
+            while pending or running:
+                for name, stage in list(pending.items()):
+                    if stage.dependencies <= results.keys():
+                        running[pool.submit(self._run_stage, stage, dict(results))] = name
+                        del pending[name]
+                if not running:
+                    raise SystemExit(f"Unresolvable stage dependencies: {sorted(pending)}")
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    result = future.result()
+                    results[running.pop(future)] = result
+        return results
+
+    def _resolve_inputs(self, stage: Stage, results: Dict[str, StageResult]) -> Dict[str, Path]:
+        paths = {}
+        for name, ref in stage.inputs.items():
+            path = results[ref[0]].out_dir / ref[1] if isinstance(ref, tuple) else Path(ref)
+            if not path.exists():
+                raise SystemExit(f"[{stage.name}] input '{name}' not found: {path}")
+            paths[name] = path
+        return paths
+
+    def _run_stage(self, stage: Stage, results: Dict[str, StageResult]) -> StageResult:
+        started = time.perf_counter()
+        inputs = self._resolve_inputs(stage, results)
+        input_hashes = {
+            name: results[ref[0]].outputs[ref[1]] if isinstance(ref, tuple) else file_sha256(inputs[name])
+            for name, ref in stage.inputs.items()
+        }
+        key_payload = {
+            "stage": stage.name,
+            "inputs": input_hashes,
+            "params": stage.params,
+            "code": {path.name: file_sha256(path) for path in stage.code},
+        }
+        key = hashlib.sha256(json.dumps(key_payload, sort_keys=True).encode()).hexdigest()[:16]
+        out_dir = self.cache_dir / stage.name / key
+        record_path = out_dir / STAGE_RECORD
+
+        cached = (
+            stage.name not in self.force
+            and record_path.exists()
+            and all((out_dir / output).exists() for output in stage.outputs)
+        )
+        if cached:
+            outputs = json.loads(record_path.read_text())["outputs"]
+        else:
+            tmp_dir = self.cache_dir / stage.name / f".tmp-{key}-{uuid.uuid4().hex[:8]}"
+            tmp_dir.mkdir(parents=True)
+            try:
+                stage.run(inputs, tmp_dir)
+                missing = [output for output in stage.outputs if not (tmp_dir / output).exists()]
+                if missing:
+                    raise RuntimeError(f"[{stage.name}] did not produce {missing}")
+                outputs = {output: tree_sha256(tmp_dir / output) for output in stage.outputs}
+                record = {**key_payload, "key": key, "outputs": outputs}
+                (tmp_dir / STAGE_RECORD).write_text(json.dumps(record, indent=2))
+                if out_dir.exists():
+                    shutil.rmtree(out_dir)
+                os.replace(tmp_dir, out_dir)
+            finally:
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+
+        seconds = time.perf_counter() - started
+        print(f"[{stage.name}] {'cached' if cached else 'built'} in {seconds:.2f}s (key={key})")
+        return StageResult(stage.name, key, out_dir, cached, seconds, input_hashes, outputs)
+
+
+def run_clean(inputs: Dict[str, Path], out_dir: Path) -> None:
+    df = preprocess.clean_dataframe(preprocess.load_raw(inputs["netflix"], inputs["disney"]))
+    df.to_parquet(out_dir / "titles_clean.parquet", index=False)
+
+
+def run_metadata(inputs: Dict[str, Path], out_dir: Path) -> None:
+    df = embedder.load_clean_titles(inputs["clean"])
+    embedder.prepare_metadata(df).to_parquet(out_dir / "titles_metadata.parquet", index=False)
+
+
+def run_embed(inputs: Dict[str, Path], out_dir: Path, args: argparse.Namespace) -> None:
+    df = embedder.load_clean_titles(inputs["clean"])
+    corpus = encoder.title_corpus(df, text_column=args.text_column)
+    embeddings = encoder.encode_corpus(
+        texts=corpus,
+        model_name=args.model,
+        batch_size=args.batch_size,
+        normalize=EMBED_NORMALIZE,
+        engine=args.engine,
+        onnx_dir=args.onnx_dir,
+        max_seq_length=args.max_seq_length,
+        local_only=args.offline,
+    )
+    np.save(out_dir / "title_embeddings.npy", embeddings)
+
+
+def run_lexical(inputs: Dict[str, Path], out_dir: Path, args: argparse.Namespace) -> None:
+    df = embedder.load_clean_titles(inputs["clean"])
+    texts = lexical.title_texts(df, args.text_column)
+    lexical.save_matrix(out_dir / "titles_bm25.npz", lexical.build_bm25_matrix(texts))
+
+
+def run_index(inputs: Dict[str, Path], out_dir: Path) -> None:
+    embeddings = indexer.load_embeddings(inputs["embeddings"])
+    index = indexer.build_faiss_index(embeddings.copy())
+    indexer.faiss.write_index(index, str(out_dir / "titles_faiss.index"))
+
+
+def run_shards(inputs: Dict[str, Path], out_dir: Path, args: argparse.Namespace) -> None:
+    embeddings = indexer.load_embeddings(inputs["embeddings"])
+    indexer.write_shards(embeddings, args.shards, out_dir / "shards")
+
+
+def build_stages(args: argparse.Namespace) -> List[Stage]:
+    stages = [
+        Stage(
+            name="clean",
+            inputs={"netflix": args.netflix, "disney": args.disney},
+            outputs=["titles_clean.parquet"],
+            run=run_clean,
+            code=[PIPELINE_DIR / "preprocess.py"],
+        ),
+        Stage(
+            name="metadata",
+            inputs={"clean": ("clean", "titles_clean.parquet")},
+            outputs=["titles_metadata.parquet"],
+            run=run_metadata,
+            code=[PIPELINE_DIR / "embedder.py"],
+        ),
+        Stage(
+            name="embed",
+            inputs={"clean": ("clean", "titles_clean.parquet")},
+            outputs=["title_embeddings.npy"],
+            run=partial(run_embed, args=args),
+            params={
+                "model_id": encoder.model_id(args.model),
+                "engine": args.engine,
+                "max_seq_length": args.max_seq_length if args.engine != "torch" else None,
+                # --onnx-dir is not part of the key, so key on the model file it holds.
+                "onnx_model_sha256": (
+                    encoder.onnx_model_sha256(args.model, args.engine, args.onnx_dir, args.offline)
+                    if args.engine != "torch"
+                    else None
+                ),
+                "text_column": args.text_column,
+                "normalize": EMBED_NORMALIZE,
+            },
+            code=[PIPELINE_DIR / "encoder.py"],
+        ),
+        Stage(
+            name="lexical",
+            inputs={"clean": ("clean", "titles_clean.parquet")},
+            outputs=["titles_bm25.npz"],
+            run=partial(run_lexical, args=args),
+            params={"text_column": args.text_column, "k1": lexical.DEFAULT_K1, "b": lexical.DEFAULT_B},
+            code=[PIPELINE_DIR / "lexical.py"],
+        ),
+        Stage(
+            name="index",
+            inputs={"embeddings": ("embed", "title_embeddings.npy")},
+            outputs=["titles_faiss.index"],
+            run=run_index,
+            params={"backend": "faiss", "type": "IndexFlatIP"},
+            code=[PIPELINE_DIR / "indexer.py"],
+        ),
+    ]
+    if args.shards:
+        stages.append(
+            Stage(
+                name="shards",
+                inputs={"embeddings": ("embed", "title_embeddings.npy")},
+                outputs=["shards"],
+                run=partial(run_shards, args=args),
+                params={"num_shards": args.shards, "type": "IndexFlatIP"},
+                code=[PIPELINE_DIR / "indexer.py"],
+            )
+        )
+    return stages
+
+
+# Files served by the backend: build file name -> (stage, stage output).
+PUBLISHED = {
+    "titles_metadata.parquet": ("metadata", "titles_metadata.parquet"),
+    "title_embeddings.npy": ("embed", "title_embeddings.npy"),
+    "titles_faiss.index": ("index", "titles_faiss.index"),
+    "titles_bm25.npz": ("lexical", "titles_bm25.npz"),
+}
+
+
+def link_or_copy(src: Path, dst: Path) -> None:
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+def write_atomic(path: Path, text: str) -> None:
+    tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex[:8]}")
+    tmp.write_text(text)
+    os.replace(tmp, path)
+
+
+def publish(results: Dict[str, StageResult], artifacts_dir: Path) -> Tuple[str, Path]:
+    """
+    Assemble the served files into builds/<version>/ and point CURRENT at it.
+    """
+    published = dict(PUBLISHED)
+    if "shards" in results:
+        published["shards"] = ("shards", "shards")
+    files = {name: results[stage].outputs[output] for name, (stage, output) in published.items()}
+    version = hashlib.sha256(json.dumps(files, sort_keys=True).encode()).hexdigest()[:12]
+    builds_dir = artifacts_dir / "builds"
+    build_dir = builds_dir / version
+
+    if not build_dir.exists():
+        tmp_dir = builds_dir / f".tmp-{version}-{uuid.uuid4().hex[:8]}"
+        tmp_dir.mkdir(parents=True)
+        try:
+            for name, (stage, output) in published.items():
+                src = results[stage].out_dir / output
+                if src.is_dir():
+                    shutil.copytree(src, tmp_dir / name, copy_function=link_or_copy)
+                else:
+                    link_or_copy(src, tmp_dir / name)
+
+            num_vectors, dim = np.load(tmp_dir / "title_embeddings.npy", mmap_mode="r").shape
+            manifest = {
+                "version": version,
+                "generated_at": datetime.now(timezone.utc).isoformat(),
+                "source_embeddings": "title_embeddings.npy",
+                "num_vectors": int(num_vectors),
+                "vector_dim": int(dim),
+                "backend": "faiss",
+                "index_file": "titles_faiss.index",
+                "lexical_file": "titles_bm25.npz",
+                "shards_dir": "shards" if "shards" in published else None,
+                "files": files,
+                "stages": {
+                    name: {"key": result.key, "inputs": result.inputs, "outputs": result.outputs}
+                    for name, result in results.items()
+                },
+            }
+            (tmp_dir / MANIFEST_FILE).write_text(json.dumps(manifest, indent=2))
+            os.replace(tmp_dir, build_dir)
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    write_atomic(artifacts_dir / CURRENT_POINTER, version + "\n")
+    return version, build_dir
+
+
+def prune_builds(artifacts_dir: Path, keep: int, current: str) -> None:
+    builds = [
+        path
+        for path in (artifacts_dir / "builds").iterdir()
+        if path.is_dir() and not path.name.startswith(".") and path.name != current
+    ]
+    builds.sort(key=lambda path: path.stat().st_mtime, reverse=True)
+    for stale in builds[keep:]:
+        shutil.rmtree(stale, ignore_errors=True)
+
+
+def main() -> None:
+    args = parse_args()
+    if args.offline:
+        os.environ["HF_HUB_OFFLINE"] = "1"
+        os.environ["TRANSFORMERS_OFFLINE"] = "1"
+
+    stages = build_stages(args)
+    if args.force is None:
+        force: Set[str] = set()
+    else:
+        force = set(args.force) or {stage.name for stage in stages}
+    started = time.perf_counter()
+    results = PipelineRunner(stages, args.artifacts_dir, args.workers, force).run()
+    version, build_dir = publish(results, args.artifacts_dir)
+    prune_builds(args.artifacts_dir, args.keep_builds, version)
+
+    rebuilt = [name for name, result in results.items() if not result.cached]
+    print(
+        f"Pipeline finished in {time.perf_counter() - started:.2f}s "
+        f"(rebuilt: {', '.join(rebuilt) or 'none'})\n"
+        f"Build {version} -> {build_dir}\n"
+        f"CURRENT -> {version}"
+    )
+
+
+if __name__ == "__main__":
+    main()